@@ -0,0 +1,86 @@
+"""
+In-process pub/sub for risk-level changes.
+risk_engine.update_user_risk publishes an event whenever a student's level
+changes; counsellor dashboards receive them through the SSE stream or the
+short-poll fallback (counsellor.views.alerts_stream / alerts_poll).
+Events live in a bounded ring buffer with increasing ids, so a reconnecting
+client resumes from its last id. Sync code blocks in wait(); async code (the
+SSE stream under ASGI) awaits wait_async(), which holds no thread while idle.
+Subscribers only see events published in the
+same process; run the app as a single ASGI/WSGI process with threads (or put a
+shared broker behind this API) when counsellors must see every escalation.
+"""
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class AlertBroker:
+    def __init__(self, size=500):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=size)
+        self._last_id = 0
+        self._async_waiters = set()  # (event loop, asyncio.Event) of wait_async() callers
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event):
+        """Add an event (dict) and wake every waiting subscriber. Returns its id."""
+        with self._cond:
+            self._last_id += 1
+            self._events.append(dict(event, id=self._last_id))
+            self._cond.notify_all()
+            for loop, wake in self._async_waiters:
+                try:
+                    loop.call_soon_threadsafe(wake.set)
+                except RuntimeError:
+                    pass  # loop already closed; its waiter is gone
+            return self._last_id
+
+    def _since(self, last_id):
+        return [e for e in self._events if e['id'] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Events newer than last_id, blocking up to `timeout` seconds for the first one."""
+        with self._cond:
+            if last_id > self._last_id:
+                last_id = self._last_id  # ids restarted with the process
+            self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+            return self._since(last_id)
+
+    async def wait_async(self, last_id, timeout):
+        """wait() for async code: awaits the first newer event without blocking a thread."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            if last_id > self._last_id:
+                last_id = self._last_id
+            if self._last_id > last_id:
+                return self._since(last_id)
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        with self._cond:
+            return self._since(last_id)
+
+
+broker = AlertBroker()
+
+
+def publish_level_change(user, previous, level, escalated):
+    """Publish a student's risk level change."""
+    return broker.publish({
+        'user_id': user.id,
+        'name': user.name,
+        'previous': previous,
+        'level': level,
+        'escalated': escalated,
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+    })
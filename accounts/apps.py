@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AccountsConfig(AppConfig):
+    name = 'accounts'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from wellness_connect.sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='sqlite_configure_connection')
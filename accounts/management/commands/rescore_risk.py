@@ -0,0 +1,91 @@
+"""
+Recompute risk_score, current_stress_level and is_flagged_high for every student
+from their rolling RiskState, or from their latest chat level and latest PHQ/GAD
+scores (MongoDB) for students without one.
+Run after changing the thresholds in accounts/risk_engine.py, and periodically
+(e.g. daily) so decayed chat levels and expired assessments are reflected.
+Usage: python manage.py rescore_risk [--chunk-size 2000] [--dry-run]
+Students are streamed in id order, scored per chunk with risk_engine.final_level_scores
+and written back with bulk_update, so memory stays flat and there is no save() per user.
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.risk_engine import final_level_scores, level_for_score, risk_inputs_from_state
+from student.loaders import latest_assessments_for_users, latest_chat_levels_for_users
+from student.models import RiskState
+from wellness_connect.fragments import bump
+
+RISK_FIELDS = ['risk_score', 'current_stress_level', 'is_flagged_high']
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored risk fields for all students from their latest chat and assessment.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Score but do not write.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+        scanned = changed = 0
+        last_id = 0
+        while True:
+            students = list(
+                User.objects.filter(role='Student', id__gt=last_id)
+                .order_by('id')
+                .only('id', *RISK_FIELDS)[:chunk_size]
+            )
+            if not students:
+                break
+            last_id = students[-1].id
+            ids = [u.id for u in students]
+            scores = self._scores(ids, datetime.utcnow())
+
+            updates = []
+            for user, score in zip(students, scores.tolist()):
+                level = level_for_score(score)
+                if (user.risk_score, user.current_stress_level, user.is_flagged_high) == (score, level, level == 'High'):
+                    continue
+                user.risk_score = score
+                user.current_stress_level = level
+                user.is_flagged_high = level == 'High'
+                updates.append(user)
+            if updates and not options['dry_run']:
+                User.objects.bulk_update(updates, RISK_FIELDS, batch_size=500)
+                bump('risk')
+            scanned += len(students)
+            changed += len(updates)
+            self.stdout.write(f'{scanned} students scanned, {changed} changed')
+
+        verb = 'would change' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'Rescored {scanned} students ({changed} {verb}) in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def _scores(self, ids, now):
+        """Risk scores for `ids` (same order): one RiskState read plus fallbacks for stateless users."""
+        states = {doc['_id']: doc for doc in RiskState._get_collection().find({'_id': {'$in': ids}})}
+        missing = [i for i in ids if i not in states]
+        chats = latest_chat_levels_for_users(missing)
+        assessments = latest_assessments_for_users(missing)
+
+        chat_levels, phqs, gads, peaks = [], [], [], []
+        for i in ids:
+            if i in states:
+                chat_level, phq, gad, peak = risk_inputs_from_state(states[i], now)
+            else:
+                latest = assessments.get(i)
+                chat_level, phq, gad, peak = (
+                    chats.get(i), getattr(latest, 'phq_score', None), getattr(latest, 'gad_score', None), 0,
+                )
+            chat_levels.append(chat_level)
+            phqs.append(phq)
+            gads.append(gad)
+            peaks.append(peak)
+        return np.maximum(final_level_scores(chat_levels, phqs, gads), np.array(peaks, dtype=np.int64))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_add_risk_engine_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'current_stress_level', '-risk_score', 'name', 'id'], name='user_tier_keyset_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 
@@ -51,11 +52,23 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    date_joined = models.DateTimeField(default=timezone.now, db_index=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name', 'role']
 
+    class Meta:
+        indexes = [
+            # Counsellor dashboard: per-tier keyset pagination and tier counts
+            models.Index(
+                fields=['role', 'current_stress_level', '-risk_score', 'name', 'id'],
+                name='user_tier_keyset_idx',
+            ),
+            # Admin user directory: newest first, optionally filtered by role
+            models.Index(fields=['role', '-date_joined', '-id'], name='user_role_joined_idx'),
+        ]
+
     def __str__(self):
         return self.email
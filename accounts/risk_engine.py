@@ -1,10 +1,41 @@
 """
 Risk Engine – single place for all risk/stress level logic.
 Used by chatbot, assessment, and counsellor views. Do not duplicate rules elsewhere.
+
+A student's level comes from a rolling RiskState (student.models), not just the
+latest event: chat levels are counted with exponential time decay, PHQ/GAD scores
+stay valid for ASSESSMENT_VALID_DAYS, and the highest event in the last
+PEAK_WINDOW_HOURS acts as a floor. Each event updates the state with one atomic
+upsert, so a 'Low' chat right after a PHQ of 20 no longer resets the student to Low.
 """
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from student.models import RiskState
+from wellness_connect.fragments import bump
+
+from . import risk_writes
+from .alerts import publish_level_change
+
+# Rolling-state tuning (clinician-owned)
+CHAT_HALF_LIFE_HOURS = 72  # a chat event's weight halves every 3 days
+CHAT_LEVEL_THRESHOLD = 0.5  # decayed count needed for a chat level to hold
+ASSESSMENT_VALID_DAYS = 14  # PHQ-9/GAD-7 cover the past two weeks
+PEAK_WINDOW_HOURS = 24  # highest event level holds for this long
+
+# PHQ-9 / GAD-7 cut-offs (clinician-owned): at least HIGH_MIN is High, at least MEDIUM_MIN Medium
+HIGH_MIN = 15
+MEDIUM_MIN = 10
+
+_DECAY_PER_SECOND = math.log(2) / (CHAT_HALF_LIFE_HOURS * 3600)
+_EPOCH = datetime(1970, 1, 1)
 
 # Numeric mapping for risk_score (for ordering/display)
 _LEVEL_SCORE = {'Low': 1, 'Medium': 2, 'High': 3}
+_SCORE_LEVEL = {score: level for level, score in _LEVEL_SCORE.items()}
 
 
 def calculate_chat_risk(chat_level):
@@ -28,9 +59,9 @@ def calculate_assessment_risk(phq, gad):
     """
     p = 0 if phq is None else int(phq)
     g = 0 if gad is None else int(gad)
-    if p >= 15 or g >= 15:
+    if p >= HIGH_MIN or g >= HIGH_MIN:
         return 'High'
-    if 10 <= p <= 14 or 10 <= g <= 14:
+    if MEDIUM_MIN <= p < HIGH_MIN or MEDIUM_MIN <= g < HIGH_MIN:
         return 'Medium'
     return 'Low'
 
@@ -39,8 +70,8 @@ def determine_final_level(chat_level=None, phq=None, gad=None):
     """
     Combine chat and assessment inputs into one final level.
     Rules:
-    - HIGH if chat_level == 'High' OR phq >= 15 OR gad >= 15
-    - MEDIUM if chat_level == 'Medium' OR 10 <= phq <= 14 OR 10 <= gad <= 14
+    - HIGH if chat_level == 'High' OR phq >= HIGH_MIN OR gad >= HIGH_MIN (15)
+    - MEDIUM if chat_level == 'Medium' OR phq or gad from MEDIUM_MIN (10) to HIGH_MIN - 1
     - LOW otherwise
     """
     chat_risk = calculate_chat_risk(chat_level)
@@ -52,14 +83,152 @@ def determine_final_level(chat_level=None, phq=None, gad=None):
     return 'Low'
 
 
-def update_user_risk(user, chat_level=None, phq=None, gad=None):
+def final_level_scores(chat_levels, phqs, gads):
+    """
+    Vectorized determine_final_level for many users at once (used by bulk jobs).
+    Takes equal-length sequences (None allowed, as in determine_final_level) and
+    returns a NumPy int array of risk scores (1=Low, 2=Medium, 3=High).
+    Use level_for_score() to map a score back to its level.
+    """
+    import numpy as np
+
+    chat = np.char.strip(np.array([c or '' for c in chat_levels], dtype=str))
+    chat_score = np.select([chat == 'High', chat == 'Medium'], [3, 2], default=1)
+
+    p = np.array([0 if v is None else int(v) for v in phqs], dtype=np.int64)
+    g = np.array([0 if v is None else int(v) for v in gads], dtype=np.int64)
+    high = (p >= HIGH_MIN) | (g >= HIGH_MIN)
+    medium = ((p >= MEDIUM_MIN) & (p < HIGH_MIN)) | ((g >= MEDIUM_MIN) & (g < HIGH_MIN))
+    assess_score = np.select([high, medium], [3, 2], default=1)
+
+    # HIGH beats MEDIUM beats LOW, so the final level is the larger score
+    return np.maximum(chat_score, assess_score)
+
+
+def level_for_score(score):
+    """Map a risk score from final_level_scores back to 'Low', 'Medium' or 'High'."""
+    return _SCORE_LEVEL[int(score)]
+
+
+def risk_state_update(chat_level=None, phq=None, gad=None, now=None):
     """
-    Update user's risk_score, current_stress_level, and is_flagged_high.
-    Saves the user. Returns final_level ('Low', 'Medium', 'High').
+    MongoDB update pipeline that folds one event into a RiskState document.
+    Decay, counts, last scores and the rolling maximum are all computed
+    server-side, so applying it with an upsert is atomic and O(1).
     """
+    now = now or datetime.utcnow()
+    elapsed_ms = {'$max': [0, {'$subtract': [now, {'$ifNull': ['$updated_at', now]}]}]}
+    decay = {'$exp': {'$multiply': [-_DECAY_PER_SECOND, {'$divide': [elapsed_ms, 1000]}]}}
+    chat = calculate_chat_risk(chat_level) if chat_level else None
+    event_score = _LEVEL_SCORE[determine_final_level(chat_level=chat_level, phq=phq, gad=gad)]
+    peak_expired = {'$lt': [{'$ifNull': ['$peak_at', _EPOCH]}, now - timedelta(hours=PEAK_WINDOW_HOURS)]}
+    new_peak = {'$or': [{'$gte': [event_score, {'$ifNull': ['$peak_score', 0]}]}, peak_expired]}
+
+    fields = {
+        'chat_low': {'$add': [{'$multiply': [{'$ifNull': ['$chat_low', 0]}, '$_decay']}, int(chat == 'Low')]},
+        'chat_medium': {'$add': [{'$multiply': [{'$ifNull': ['$chat_medium', 0]}, '$_decay']}, int(chat == 'Medium')]},
+        'chat_high': {'$add': [{'$multiply': [{'$ifNull': ['$chat_high', 0]}, '$_decay']}, int(chat == 'High')]},
+        'peak_score': {'$cond': [new_peak, event_score, '$peak_score']},
+        'peak_at': {'$cond': [new_peak, now, '$peak_at']},
+        'updated_at': now,
+    }
+    if phq is not None:
+        fields.update(last_phq=int(phq), last_phq_at=now)
+    if gad is not None:
+        fields.update(last_gad=int(gad), last_gad_at=now)
+    return [{'$set': {'_decay': decay}}, {'$set': fields}, {'$project': {'_decay': 0}}]
+
+
+def assessment_state_update(phq, gad, taken_at):
+    """
+    Update pipeline folding an assessment taken at `taken_at` (e.g. an imported
+    paper form, possibly days old) into a RiskState. Scores and peak are stamped
+    with taken_at, so an old form keeps only what is left of its validity, and
+    each is replaced only by a form newer than the stored one: an old form never
+    overrides a later assessment. Chat counts and decay are left alone.
+    """
+    event_score = _LEVEL_SCORE[determine_final_level(phq=phq, gad=gad)]
+    peak_at = {'$ifNull': ['$peak_at', _EPOCH]}
+    newer = {field: {'$gt': [taken_at, {'$ifNull': [f'${field}', _EPOCH]}]} for field in ('last_phq_at', 'last_gad_at')}
+    new_peak = {'$and': [
+        {'$gte': [taken_at, peak_at]},
+        {'$or': [
+            {'$gte': [event_score, {'$ifNull': ['$peak_score', 0]}]},
+            {'$lt': [peak_at, taken_at - timedelta(hours=PEAK_WINDOW_HOURS)]},
+        ]},
+    ]}
+    return [{'$set': {
+        'last_phq': {'$cond': [newer['last_phq_at'], int(phq), '$last_phq']},
+        'last_phq_at': {'$cond': [newer['last_phq_at'], taken_at, '$last_phq_at']},
+        'last_gad': {'$cond': [newer['last_gad_at'], int(gad), '$last_gad']},
+        'last_gad_at': {'$cond': [newer['last_gad_at'], taken_at, '$last_gad_at']},
+        'peak_score': {'$cond': [new_peak, event_score, '$peak_score']},
+        'peak_at': {'$cond': [new_peak, taken_at, '$peak_at']},
+    }}]
+
+
+def risk_inputs_from_state(state, now=None):
+    """
+    Reduce a RiskState document (dict) to determine_final_level inputs at time `now`.
+    Returns (chat_level, phq, gad, peak_score); expired inputs come back as None/0.
+    """
+    now = now or datetime.utcnow()
+    updated_at = state.get('updated_at') or now
+    decay = math.exp(-_DECAY_PER_SECOND * max(0.0, (now - updated_at).total_seconds()))
+    high = (state.get('chat_high') or 0) * decay
+    medium = (state.get('chat_medium') or 0) * decay
+    if high >= CHAT_LEVEL_THRESHOLD:
+        chat_level = 'High'
+    elif high + medium >= CHAT_LEVEL_THRESHOLD:
+        chat_level = 'Medium'
+    else:
+        chat_level = 'Low'
+
+    valid_since = now - timedelta(days=ASSESSMENT_VALID_DAYS)
+    phq = state.get('last_phq') if (state.get('last_phq_at') or _EPOCH) >= valid_since else None
+    gad = state.get('last_gad') if (state.get('last_gad_at') or _EPOCH) >= valid_since else None
+    peak_fresh = (state.get('peak_at') or _EPOCH) >= now - timedelta(hours=PEAK_WINDOW_HOURS)
+    peak_score = (state.get('peak_score') or 0) if peak_fresh else 0
+    return chat_level, phq, gad, peak_score
+
+
+def level_from_state(state, now=None):
+    """Final level ('Low', 'Medium', 'High') for a RiskState document at time `now`."""
+    chat_level, phq, gad, peak_score = risk_inputs_from_state(state, now)
     final = determine_final_level(chat_level=chat_level, phq=phq, gad=gad)
-    user.current_stress_level = final
-    user.risk_score = _LEVEL_SCORE.get(final, 0)
-    user.is_flagged_high = (final == 'High')
-    user.save(update_fields=['risk_score', 'current_stress_level', 'is_flagged_high'])
+    return level_for_score(max(_LEVEL_SCORE[final], peak_score, 1))
+
+
+def update_user_risk(user, chat_level=None, phq=None, gad=None):
+    """
+    Fold one event (a chat level, or PHQ/GAD scores) into the user's RiskState and
+    update risk_score, current_stress_level, and is_flagged_high from it.
+    Saves the user only when the fields change: escalations at once, other changes
+    coalesced through accounts.risk_writes. Publishes level changes to counsellors
+    (accounts.alerts).
+    Returns final_level ('Low', 'Medium', 'High').
+    """
+    now = datetime.utcnow()
+    state = RiskState._get_collection().find_one_and_update(
+        {'_id': user.id},
+        risk_state_update(chat_level=chat_level, phq=phq, gad=gad, now=now),
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    final = level_from_state(state, now)
+    stored = (user.risk_score, user.current_stress_level, user.is_flagged_high)
+    previous = (risk_writes.buffer.pending(user.id) or stored)[1]
+    values = (_LEVEL_SCORE.get(final, 0), final, final == 'High')
+    user.risk_score, user.current_stress_level, user.is_flagged_high = values
+    if values == stored:
+        risk_writes.buffer.discard(user.id)  # back to what is stored; nothing to write
+    elif _LEVEL_SCORE[final] > _LEVEL_SCORE.get(stored[1], 0) or not settings.RISK_WRITE_COALESCE_SECONDS:
+        risk_writes.buffer.discard(user.id)
+        user.save(update_fields=risk_writes.RISK_FIELDS)
+        bump('risk')  # cached dashboard fragments (wellness_connect.fragments)
+    else:
+        risk_writes.buffer.hold(user.id, values, stored)  # written (and bumped) by the next flush
+    if final != previous:
+        escalated = _LEVEL_SCORE[final] > _LEVEL_SCORE.get(previous, 0)
+        publish_level_change(user, previous, final, escalated)
     return final
@@ -0,0 +1,90 @@
+"""
+Coalesced writes of the User risk fields (risk_score, current_stress_level,
+is_flagged_high) for risk_engine.update_user_risk.
+SQLite has a single writer, and every chat message used to end in a User save.
+Escalations are still written at once, so counsellors see them immediately.
+Non-escalating changes are held for RISK_WRITE_COALESCE_SECONDS: later events
+for the same user replace the pending value, and a background thread writes
+everything pending in one transaction. Each held change remembers the stored
+values it was computed from and is written only if they are still stored, so a
+flush never overwrites an escalation saved meanwhile by this or another process.
+A change held in memory is lost if the process dies before the flush; the
+stored level is then the higher, older one until the student's next event.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from wellness_connect.fragments import bump
+
+logger = logging.getLogger(__name__)
+
+RISK_FIELDS = ['risk_score', 'current_stress_level', 'is_flagged_high']
+
+
+class RiskWriteBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # user id -> (new values, stored values they replace); see RISK_FIELDS
+        self._flusher = None
+
+    def pending(self, user_id):
+        """The held, not yet written risk fields of a user, or None."""
+        with self._lock:
+            held = self._pending.get(user_id)
+            return held[0] if held else None
+
+    def discard(self, user_id):
+        with self._lock:
+            self._pending.pop(user_id, None)
+
+    def hold(self, user_id, values, stored):
+        """Queue the risk fields of a user for the next flush, if `stored` is still what is stored then."""
+        with self._lock:
+            self._pending[user_id] = (values, stored)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='risk-write-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.RISK_WRITE_COALESCE_SECONDS)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Writing held risk fields failed; retrying on the next flush')
+
+    def flush(self):
+        """
+        Write every held change in one transaction, each one only where the stored
+        fields are unchanged since it was held. Returns how many users were written.
+        """
+        from .models import User
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        written = 0
+        try:
+            with transaction.atomic():
+                for uid, (values, stored) in pending.items():
+                    written += User.objects.filter(id=uid, **dict(zip(RISK_FIELDS, stored))).update(
+                        **dict(zip(RISK_FIELDS, values)))
+        except Exception:
+            with self._lock:
+                for uid, held in pending.items():
+                    self._pending.setdefault(uid, held)  # newer values held meanwhile win
+            raise
+        if written:
+            bump('risk')
+        return written
+
+
+buffer = RiskWriteBuffer()
+atexit.register(buffer.flush)
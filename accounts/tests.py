@@ -0,0 +1,99 @@
+import io
+from itertools import product
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from student.models import Assessment, ChatLog
+from wellness_connect.testing import MongoTestCase
+
+from . import risk_engine
+from .models import User
+from .risk_engine import determine_final_level, final_level_scores, level_for_score, update_user_risk
+from .risk_writes import RiskWriteBuffer, buffer
+
+LOW = (1, 'Low', False)
+MEDIUM = (2, 'Medium', False)
+HIGH = (3, 'High', True)
+
+
+def _stored(user):
+    user.refresh_from_db()
+    return user.risk_score, user.current_stress_level, user.is_flagged_high
+
+
+class RiskWriteBufferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('s@example.com', 'S', 'Student', 'pw123456')
+        User.objects.filter(id=self.user.id).update(risk_score=2, current_stress_level='Medium')
+        self.buffer = RiskWriteBuffer()
+
+    def test_flush_writes_held_change(self):
+        self.buffer.hold(self.user.id, LOW, MEDIUM)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(_stored(self.user), LOW)
+
+    def test_flush_never_overwrites_a_later_escalation(self):
+        self.buffer.hold(self.user.id, LOW, MEDIUM)
+        # Escalation saved after the change was held (a flush may already have taken it)
+        User.objects.filter(id=self.user.id).update(risk_score=3, current_stress_level='High', is_flagged_high=True)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(_stored(self.user), HIGH)
+
+
+@override_settings(RISK_WRITE_COALESCE_SECONDS=60)
+class UpdateUserRiskTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('s@example.com', 'S', 'Student', 'pw123456')
+        User.objects.filter(id=self.user.id).update(risk_score=2, current_stress_level='Medium')
+        self.user.refresh_from_db()
+
+    def test_lowering_is_held_and_escalation_written_at_once(self):
+        self.assertEqual(update_user_risk(self.user, chat_level='Low'), 'Low')
+        self.assertEqual(_stored(self.user), MEDIUM)  # held, not written yet
+        self.assertEqual(buffer.pending(self.user.id), LOW)
+
+        update_user_risk(self.user, chat_level='High')
+        self.assertEqual(_stored(self.user), HIGH)
+        self.assertIsNone(buffer.pending(self.user.id))
+
+    def test_held_lowering_from_another_process_does_not_undo_escalation(self):
+        update_user_risk(self.user, chat_level='Low')  # held here
+        other = User.objects.get(id=self.user.id)  # another process escalates the same student
+        other.risk_score, other.current_stress_level, other.is_flagged_high = HIGH
+        other.save()
+        buffer.flush()
+        self.assertEqual(_stored(self.user), HIGH)
+
+
+class FinalLevelScoresTests(SimpleTestCase):
+    def test_matches_determine_final_level_on_every_input(self):
+        grid = list(product([None, 'Low', 'Medium', 'High', ' High '], [None, *range(28)], [None, *range(22)]))
+        chats, phqs, gads = zip(*grid)
+        scores = final_level_scores(chats, phqs, gads)
+        for (chat, phq, gad), score in zip(grid, scores.tolist()):
+            self.assertEqual(level_for_score(score), determine_final_level(chat, phq, gad), (chat, phq, gad))
+
+
+class RescoreRiskTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.medium = User.objects.create_user('m@example.com', 'M', 'Student', 'pw123456')
+        self.chatty = User.objects.create_user('c@example.com', 'C', 'Student', 'pw123456')
+        Assessment(user_id=self.medium.id, total_score=12, stress_level='Medium', phq_score=12, gad_score=0).save()
+        ChatLog(user_id=self.chatty.id, message='m', response='r', stress_level='High').save()
+
+    def _rescore(self):
+        call_command('rescore_risk', stdout=io.StringIO())
+
+    def test_rescores_stateless_students_from_latest_events(self):
+        self._rescore()
+        self.assertEqual(_stored(self.medium), MEDIUM)
+        self.assertEqual(_stored(self.chatty), HIGH)
+
+    def test_follows_changed_thresholds(self):
+        with mock.patch.object(risk_engine, 'HIGH_MIN', 12):
+            self._rescore()
+        self.assertEqual(_stored(self.medium), HIGH)
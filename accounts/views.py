@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from wellness_connect.fragments import bump
 from .forms import RegisterForm
 
 
@@ -45,6 +46,7 @@ def register_view(request):
         form = RegisterForm(request.POST)
         if form.is_valid():
             user = form.save()
+            bump('users')
             login(request, user)
             messages.success(request, f'Account created successfully! Welcome, {user.name}!')
             
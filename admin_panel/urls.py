@@ -6,4 +6,5 @@ app_name = 'admin_panel'
 urlpatterns = [
     path('', views.admin_dashboard, name='admin_dashboard'),
     path('user/<int:user_id>/delete/', views.user_delete, name='user_delete'),
+    path('screenings/upload/', views.screening_upload, name='screening_upload'),
 ]
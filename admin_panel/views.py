@@ -1,11 +1,26 @@
 """
 Admin: total users, total high-risk students, total appointments, delete user (basic CRUD).
+The user directory is keyset paginated (newest first), searchable and filterable
+by role and risk level; its total count is cached until users change.
 """
+import hashlib
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from accounts.models import User
-from student.models import ChatLog, Assessment, Appointment
+from accounts.models import ROLES, User
+from student import cascade, screenings
+from student.stats import get_stats
+from wellness_connect.fragments import bump, cached_fragment, get_versions
+from wellness_connect.pagination import decode_cursor, encode_cursor
+
+RISK_LEVELS = ('High', 'Medium', 'Low')
 
 
 @login_required
@@ -14,24 +29,97 @@ def admin_dashboard(request):
         messages.warning(request, 'Access denied.')
         return redirect('accounts:login')
 
-    total_users = User.objects.count()
-    high_risk_ids = set()
-    for a in Assessment.objects.filter(stress_level='High'):
-        high_risk_ids.add(a.user_id)
-    for log in ChatLog.objects.filter(stress_level='High'):
-        high_risk_ids.add(log.user_id)
-    total_high_risk = len(high_risk_ids)
-    total_appointments = Appointment.objects.count()
-    users = User.objects.all().order_by('-date_joined')
- 
+    stats_html = cached_fragment(
+        'admin:stats', ('users', 'stats'),
+        lambda: render_to_string('admin_panel/_stats.html', _stats_context()),
+    )
+    filters = _user_filters(request)
+    after = request.GET.get('after') or ''
+    users, next_cursor = _user_page(filters, after)
+
     return render(request, 'admin_panel/admin_dashboard.html', {
-        'total_users': total_users,
-        'total_high_risk': total_high_risk,
-        'total_appointments': total_appointments,
+        'stats_html': stats_html,
         'users': users,
+        'next_cursor': next_cursor,
+        'is_first_page': not after,
+        'total_users': _user_total(filters),
+        'filters': filters,
+        'filter_query': urlencode({k: v for k, v in filters.items() if v}),
+        'roles': [r for r, _ in ROLES],
+        'risk_levels': RISK_LEVELS,
     })
 
 
+def _user_filters(request):
+    role = (request.GET.get('role') or '').strip().capitalize()
+    risk = (request.GET.get('risk') or '').strip().capitalize()
+    return {
+        'q': (request.GET.get('q') or '').strip()[:100],
+        'role': role if role in dict(ROLES) else '',
+        'risk': risk if risk in RISK_LEVELS else '',
+    }
+
+
+def _filtered_users(filters):
+    qs = User.objects.all()
+    if filters['role']:
+        qs = qs.filter(role=filters['role'])
+    if filters['risk']:
+        qs = qs.filter(current_stress_level=filters['risk'])
+    if filters['q']:
+        qs = qs.filter(Q(name__icontains=filters['q']) | Q(email__icontains=filters['q']))
+    return qs
+
+
+def _user_page(filters, cursor=None, page_size=None):
+    """
+    One page of users matching `filters`, newest first, ordered by (-date_joined, -id).
+    Keyset paginated like the counsellor tier list, fetching only the displayed
+    columns. Returns (users, next_cursor); next_cursor is None on the last page.
+    """
+    page_size = page_size or settings.ADMIN_USERS_PAGE_SIZE
+    qs = _filtered_users(filters)
+    after = decode_cursor(cursor, 2)
+    try:
+        joined, last_id = datetime.fromisoformat(after[0]), int(after[1])
+    except (TypeError, ValueError):
+        after = None
+    if after:
+        qs = qs.filter(Q(date_joined__lt=joined) | Q(date_joined=joined, id__lt=last_id))
+    qs = qs.only('id', 'name', 'email', 'role', 'current_stress_level', 'date_joined')
+    users = list(qs.order_by('-date_joined', '-id')[:page_size + 1])
+    next_cursor = None
+    if len(users) > page_size:
+        users = users[:page_size]
+        last = users[-1]
+        next_cursor = encode_cursor([last.date_joined.isoformat(), last.id])
+    return users, next_cursor
+
+
+def _user_total(filters):
+    """Count of users matching `filters`, cached until users (or, when filtered by risk, levels) change."""
+    namespaces = ('users', 'risk') if filters['risk'] else ('users',)
+    key_parts = repr((sorted(filters.items()), get_versions(namespaces)))
+    key = 'admin:user_total:' + hashlib.md5(key_parts.encode('utf-8')).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = _filtered_users(filters).count()
+        cache.set(key, total, settings.FRAGMENT_CACHE_SECONDS)
+    return total
+
+
+def _stats_context():
+    # Precomputed counters (student.stats) instead of scanning assessments/chat logs
+    stats = get_stats()
+    return {
+        'total_users': User.objects.count(),
+        'total_high_risk': stats['high_risk_users'],
+        'total_appointments': sum(stats['appointments_by_status'].values()),
+        'appointments_by_status': sorted(stats['appointments_by_status'].items()),
+        'assessments_by_level': sorted(stats['assessments_by_level'].items()),
+    }
+
+
 @login_required
 def user_delete(request, user_id):
     if getattr(request.user, 'role', None) != 'Admin':
@@ -48,5 +136,27 @@ def user_delete(request, user_id):
         return redirect('admin_panel:admin_dashboard')
 
     target.delete()
-    messages.success(request, 'User deleted.')
+    cascade.enqueue(user_id)  # chat logs, assessments, appointments... removed in the background
+    bump('users', 'risk')
+    messages.success(request, 'User deleted. Their chat, assessment and appointment data is being removed.')
     return redirect('admin_panel:admin_dashboard')
+
+
+@login_required
+def screening_upload(request):
+    """Upload a CSV of offline PHQ-9/GAD-7 forms; scored in bulk by student.screenings."""
+    if getattr(request.user, 'role', None) != 'Admin':
+        return redirect('accounts:login')
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a CSV file.')
+            return render(request, 'admin_panel/screening_upload.html')
+        result = screenings.import_csv(upload.file)
+        levels = ', '.join(f'{level}: {n}' for level, n in sorted(result['levels'].items()))
+        messages.success(request, f"{result['imported']} forms imported ({levels or 'none'}); "
+                                  f"{result['changed']} student risk levels changed.")
+        if result['errors']:
+            messages.warning(request, f"{len(result['errors'])} rows skipped.")
+        return render(request, 'admin_panel/screening_upload.html', {'errors': result['errors'][:50]})
+    return render(request, 'admin_panel/screening_upload.html')
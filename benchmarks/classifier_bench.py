@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: compiled keyword classifier vs. one substring check per keyword.
+Usage: python -m benchmarks.classifier_bench [--repeat 5] [--messages 2000]
+Shows that the compiled classifier stays roughly flat as the lexicon grows,
+while the naive per-keyword scan grows with the number of keywords.
+"""
+import argparse
+import random
+import string
+import timeit
+
+from student.classifier import StressClassifier
+
+WORDS = ['today', 'class', 'exam', 'tired', 'friends', 'sleep', 'okay', 'really', 'feel', 'week']
+
+
+def _lexicon(size, rng):
+    """A lexicon of `size` synthetic terms, plus the default clinical keywords."""
+    terms = {''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(size)}
+    terms = sorted(terms)
+    half = len(terms) // 2
+    return {'High': ['suicid*'] + terms[:half], 'Medium': ['sad', 'anxious'] + terms[half:]}
+
+
+def _naive(keywords):
+    """The original approach: lower-case, then one substring test per keyword."""
+    high = [k.rstrip('*') for k in keywords['High']]
+    medium = [k.rstrip('*') for k in keywords['Medium']]
+
+    def classify(text):
+        t = (text or '').strip().lower()
+        if any(k in t for k in high):
+            return 'High'
+        if any(k in t for k in medium):
+            return 'Medium'
+        return 'Low'
+    return classify
+
+
+def _messages(count, length, rng):
+    return [' '.join(rng.choice(WORDS) for _ in range(length)) for _ in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    print(f"{'terms':>6} {'words/msg':>9} {'naive us/msg':>13} {'compiled us/msg':>16}")
+    for size in (10, 100, 500):
+        keywords = _lexicon(size, rng)
+        compiled = StressClassifier(keywords)
+        naive = _naive(keywords)
+        for length in (10, 100):
+            texts = _messages(args.messages, length, rng)
+            t_naive = min(timeit.repeat(lambda: [naive(t) for t in texts], number=1, repeat=args.repeat))
+            t_compiled = min(timeit.repeat(lambda: compiled.classify_many(texts), number=1, repeat=args.repeat))
+            per = 1e6 / len(texts)
+            print(f'{size:>6} {length:>9} {t_naive * per:>13.2f} {t_compiled * per:>16.2f}')
+
+
+if __name__ == '__main__':
+    main()
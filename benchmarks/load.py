@@ -0,0 +1,285 @@
+"""
+End-to-end load benchmark over synthetic data.
+Usage: python -m benchmarks.load [--students 1000 10000 100000] [--requests 200]
+                                 [--mongomock] [--output results.json]
+                                 [--baseline old.json [--tolerance 20]]
+For each data size, seeds users (SQLite) and Mongo documents (benchmarks.seed),
+then drives chatbot_send, assessment_view, counsellor_dashboard, admin_dashboard
+and student_chat_history through the Django test client, one request at a time.
+Reports p50/p95/p99 latency, throughput, and SQL queries / Mongo commands per
+request. Results are written as JSON; with --baseline, p95 latencies and query
+counts are compared against an earlier run and regressions make the exit code 1.
+Uses a separate SQLite file and Mongo database (wellness_bench), never the app's.
+--mongomock replaces MongoDB with mongomock (pip install mongomock), which is
+fine for query counts but not for absolute latencies.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from pymongo import monitoring
+
+TIERS = ('High', 'Medium', 'Low')
+MESSAGES = ['had a good day', 'feeling sad about exams', 'quite anxious today', 'okay I guess', 'so tired']
+CLIENTS_PER_ROLE = 10
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands sent by any client created after registration."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+    def started(self, event):
+        self.add()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _count_mongomock_calls(counter):
+    """mongomock emits no command events; count outermost collection calls instead."""
+    import mongomock
+
+    local = threading.local()
+    for name in ('find', 'find_one', 'aggregate', 'insert_one', 'insert_many', 'update_one',
+                 'update_many', 'replace_one', 'find_one_and_update', 'delete_one', 'delete_many',
+                 'count_documents', 'bulk_write'):
+        original = getattr(mongomock.collection.Collection, name)
+
+        def wrapper(self, *args, _original=original, **kwargs):
+            depth = getattr(local, 'depth', 0)
+            if not depth:
+                counter.add()
+            local.depth = depth + 1
+            try:
+                return _original(self, *args, **kwargs)
+            finally:
+                local.depth = depth
+        setattr(mongomock.collection.Collection, name, wrapper)
+
+
+def setup(args, counter):
+    """Configure Django against the bench SQLite file and Mongo database."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wellness_connect.settings')
+    monitoring.register(counter)  # before any MongoClient is created
+
+    import django
+    from django.conf import settings
+
+    if args.mongo_db == settings.MONGODB_NAME:
+        sys.exit(f'Refusing to benchmark against the application database {args.mongo_db!r}.')
+    fresh = not os.path.exists(args.db)
+    settings.DATABASES['default']['NAME'] = args.db
+    settings.MONGODB_NAME = args.mongo_db
+    settings.MONGODB_URI = args.mongo_uri
+    settings.ROOT_URLCONF = 'benchmarks.urls'
+    settings.RATE_LIMITS = {}  # the load would be throttled, not measured
+    django.setup()
+
+    if args.mongomock:
+        from wellness_connect.testing import connect_mongomock
+        connect_mongomock(args.mongo_db)
+        _count_mongomock_calls(counter)
+
+    from django.core.management import call_command
+    from mongoengine.connection import get_db
+
+    call_command('migrate', verbosity=0)
+    if not args.verbose:
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)  # errors are counted per endpoint
+    if fresh:
+        get_db().client.drop_database(args.mongo_db)  # data left by an earlier run
+
+
+def _percentile(sorted_values, pct):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method='inclusive')[pct - 1]
+
+
+def _answers(rng):
+    data = {f'q{i}': rng.randint(0, 3) for i in range(1, 10)}
+    data.update({f'g{i}': rng.randint(0, 3) for i in range(1, 8)})
+    return data
+
+
+def _endpoints():
+    """name -> (role of the logged-in user, fn(rng, student_ids) -> (method, path, data))."""
+    from django.urls import reverse
+
+    return {
+        'chatbot_send': ('Student', lambda rng, ids: (
+            'post', reverse('student:chatbot_send'), {'message': rng.choice(MESSAGES)})),
+        'assessment_view': ('Student', lambda rng, ids: (
+            'post', reverse('student:assessment'), _answers(rng))),
+        'counsellor_dashboard': ('Counsellor', lambda rng, ids: (
+            'get', reverse('counsellor:counsellor_dashboard'), {'tier': rng.choice(TIERS)})),
+        'admin_dashboard': ('Admin', lambda rng, ids: (
+            'get', reverse('admin_panel:admin_dashboard'), {})),
+        'student_chat_history': ('Counsellor', lambda rng, ids: (
+            'get', reverse('counsellor:student_chat_history', args=[rng.choice(ids)]), {})),
+    }
+
+
+def _clients(role, rng):
+    from django.test import Client
+
+    from .seed import bench_users
+
+    ids = list(bench_users(role).values_list('id', flat=True))
+    clients = []
+    for user in bench_users(role).filter(id__in=rng.sample(ids, min(CLIENTS_PER_ROLE, len(ids)))):
+        client = Client(raise_request_exception=False)  # count 500s instead of aborting the run
+        client.force_login(user)
+        clients.append(client)
+    return clients
+
+
+def run_endpoint(role, make, student_ids, counter, args, rng):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    clients = _clients(role, rng)
+    latencies, sql, mongo, errors = [], [], [], 0
+    started = None
+    for i in range(args.warmup + args.requests):
+        if i == args.warmup:
+            started = time.perf_counter()
+        method, path, data = make(rng, student_ids)
+        if args.cold:
+            cache.clear()
+        mongo_before = counter.count
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            response = getattr(clients[i % len(clients)], method)(path, data)
+            elapsed = time.perf_counter() - t0
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        sql.append(len(queries))
+        mongo.append(counter.count - mongo_before)
+        errors += response.status_code >= 400
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'sql_queries': round(statistics.mean(sql), 2),
+        'sql_queries_max': max(sql),
+        'mongo_commands': round(statistics.mean(mongo), 2),
+        'mongo_commands_max': max(mongo),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline` (same JSON layout), as strings."""
+    old = {(r['students'], name): row for r in baseline['runs'] for name, row in r['endpoints'].items()}
+    regressions = []
+    for run in results['runs']:
+        for name, row in run['endpoints'].items():
+            before = old.get((run['students'], name))
+            if not before:
+                continue
+            if row['p95_ms'] > before['p95_ms'] * (1 + tolerance / 100):
+                regressions.append(f"{name} @ {run['students']}: p95 {before['p95_ms']} -> {row['p95_ms']} ms")
+            for key in ('sql_queries', 'mongo_commands'):
+                if row[key] > before[key]:
+                    regressions.append(f"{name} @ {run['students']}: {key} {before[key]} -> {row[key]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[1000])
+    parser.add_argument('--chats-per-student', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint and size')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--endpoints', nargs='+', help='subset of endpoints to run')
+    parser.add_argument('--cold', action='store_true', help='clear the cache before every request')
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'wellness_bench.sqlite3'),
+                        help='SQLite file for bench users; reused (with the Mongo data) if it exists')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017')
+    parser.add_argument('--mongo-db', default='wellness_bench')
+    parser.add_argument('--mongomock', action='store_true', help='use mongomock instead of a mongod')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=20.0, help='allowed p95 increase in percent')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='log tracebacks of failing requests')
+    args = parser.parse_args(argv)
+
+    counter = CommandCounter()
+    setup(args, counter)
+
+    import django
+
+    from accounts.models import User
+
+    from . import seed
+
+    endpoints = _endpoints()
+    names = args.endpoints or list(endpoints)
+    results = {
+        'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'mongo': 'mongomock' if args.mongomock else args.mongo_uri,
+        'requests': args.requests,
+        'cold_cache': args.cold,
+        'runs': [],
+    }
+    print(f"{'students':>9} {'endpoint':<22} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7} "
+          f"{'sql':>6} {'mongo':>6} {'errors':>6}")
+    for students in sorted(args.students):
+        t0 = time.perf_counter()
+        seeded = seed.seed(students, args.chats_per_student, args.seed)
+        seeded['seconds'] = round(time.perf_counter() - t0, 1)
+        student_ids = list(seed.bench_users('Student').values_list('id', flat=True))
+        run = {'students': students, 'total_users': User.objects.count(), 'seeding': seeded, 'endpoints': {}}
+        rng = random.Random(args.seed)
+        for name in names:
+            role, make = endpoints[name]
+            row = run_endpoint(role, make, student_ids, counter, args, rng)
+            run['endpoints'][name] = row
+            print(f"{students:>9} {name:<22} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+                  f"{row['throughput_rps']:>7} {row['sql_queries']:>6} {row['mongo_commands']:>6} {row['errors']:>6}")
+        results['runs'].append(run)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
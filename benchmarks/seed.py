@@ -0,0 +1,150 @@
+"""
+Synthetic data for the load benchmarks (benchmarks.load).
+Creates bench students, counsellors and one admin in SQLite with bulk_create,
+and their chat logs, assessments and appointments in MongoDB with insert_many.
+Seeding is incremental: asking for 10k students after 1k only adds 9k.
+Requires a configured Django (benchmarks.load sets it up).
+"""
+import random
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import User
+from accounts.risk_engine import determine_final_level
+from student.models import Appointment, Assessment, ChatLog, HighRiskUser, StatsCounter
+from student.stats import STATS_ID
+from wellness_connect.fragments import bump
+
+PASSWORD = 'bench-password'
+BATCH = 5000
+LEVELS = ('Low', 'Medium', 'High')
+LEVEL_WEIGHTS = (70, 20, 10)
+_LEVEL_SCORE = {'Low': 1, 'Medium': 2, 'High': 3}
+_REPLIES = {
+    'Low': "That's good to hear. Keep taking care of yourself.",
+    'Medium': "It's okay to feel this way. Try deep breathing or a short walk.",
+    'High': 'We are concerned about your wellbeing. Please book a session.',
+}
+_MESSAGES = {
+    'Low': ['had a good day in class', 'exams went okay', 'sleeping better this week'],
+    'Medium': ['feeling sad today', 'a bit anxious about exams', 'so much anxiety lately'],
+    'High': ['having suicidal thoughts', 'thinking about suicide'],
+}
+
+
+def _email(role, i):
+    return f'bench-{role.lower()}-{i}@example.com'
+
+
+def bench_users(role):
+    return User.objects.filter(role=role, email__startswith=f'bench-{role.lower()}-')
+
+
+def _create_users(role, start, stop, password, rng):
+    """bulk_create users start..stop-1 of `role`; returns their ids."""
+    created = []
+    for lo in range(start, stop, BATCH):
+        batch = []
+        for i in range(lo, min(stop, lo + BATCH)):
+            level = rng.choices(LEVELS, LEVEL_WEIGHTS)[0] if role == 'Student' else 'Low'
+            batch.append(User(
+                email=_email(role, i),
+                name=f'Bench {role} {i}',
+                role=role,
+                password=password,
+                risk_score=_LEVEL_SCORE[level],
+                current_stress_level=level,
+                is_flagged_high=level == 'High',
+            ))
+        User.objects.bulk_create(batch)
+        created.extend(
+            bench_users(role).filter(email__in=[u.email for u in batch]).values_list('id', flat=True)
+        )
+    return created
+
+
+def _insert_many(document_cls, docs):
+    collection = document_cls._get_collection()
+    for lo in range(0, len(docs), BATCH):
+        collection.insert_many(docs[lo:lo + BATCH], ordered=False)
+
+
+def _mongo_docs(student_ids, counsellor_ids, chats_per_student, rng, now):
+    chats, assessments, appointments = [], [], []
+    for uid in student_ids:
+        for n in range(chats_per_student):
+            level = rng.choices(LEVELS, LEVEL_WEIGHTS)[0]
+            chats.append({
+                'user_id': uid,
+                'message': rng.choice(_MESSAGES[level]),
+                'response': _REPLIES[level],
+                'stress_level': level,
+                'timestamp': now - timedelta(hours=n * 7 + rng.random()),
+            })
+        phq, gad = rng.randint(0, 27), rng.randint(0, 21)
+        level = determine_final_level(phq=phq, gad=gad)
+        created = now - timedelta(days=rng.randint(0, 30))
+        assessments.append({
+            'user_id': uid, 'total_score': phq + gad, 'stress_level': level, 'date': created,
+            'phq_score': phq, 'gad_score': gad, 'chat_stress_level': '', 'final_level': level,
+            'created_at': created,
+        })
+        if counsellor_ids and rng.random() < 0.25:
+            starts_at = (now + timedelta(days=rng.randint(-14, 14))).replace(
+                hour=rng.randint(9, 16), minute=0, second=0, microsecond=0)
+            appointments.append({
+                'student_id': uid, 'counsellor_id': rng.choice(counsellor_ids),
+                'date': starts_at.date().isoformat(), 'starts_at': starts_at, 'duration_minutes': 50,
+                'status': rng.choice(('Pending', 'Approved', 'Completed')),
+            })
+    return chats, assessments, appointments
+
+
+def _count(chats, assessments, appointments, now):
+    """
+    Add the new documents to the admin stats counters and high-risk markers, the
+    way student.stats.record_* would (rebuild_stats needs $merge, which mongomock lacks).
+    """
+    fields = {'high_risk_users': 0}
+    for doc in assessments:
+        key = f"assessments_by_level.{doc['stress_level']}"
+        fields[key] = fields.get(key, 0) + 1
+    for doc in appointments:
+        key = f"appointments_by_status.{doc['status']}"
+        fields[key] = fields.get(key, 0) + 1
+    high = {doc['user_id'] for doc in chats + assessments if doc['stress_level'] == 'High'}
+    if high:
+        _insert_many(HighRiskUser, [{'_id': uid, 'first_seen': now} for uid in sorted(high)])
+        fields['high_risk_users'] = len(high)
+    StatsCounter._get_collection().update_one(
+        {'_id': STATS_ID}, {'$inc': fields, '$set': {'rebuilt_at': now}}, upsert=True)
+    bump('stats')
+
+
+def seed(students, chats_per_student=5, seed=42):
+    """
+    Ensure `students` bench students exist (plus one counsellor per 200 students
+    and one admin), with Mongo documents for the new ones counted in the admin
+    stats counters. Returns {'students': ..., 'counsellors': ..., 'added': ...}.
+    """
+    rng = random.Random(seed + students)
+    password = make_password(PASSWORD)  # hash once; hashing per user would dominate seeding
+    now = datetime.utcnow()
+
+    if not bench_users('Admin').exists():
+        _create_users('Admin', 0, 1, password, rng)
+    have = bench_users('Counsellor').count()
+    _create_users('Counsellor', have, max(1, students // 200), password, rng)
+    counsellor_ids = list(bench_users('Counsellor').values_list('id', flat=True))
+
+    have = bench_users('Student').count()
+    new_ids = _create_users('Student', have, students, password, rng)
+    for lo in range(0, len(new_ids), BATCH):
+        chats, assessments, appointments = _mongo_docs(
+            new_ids[lo:lo + BATCH], counsellor_ids, chats_per_student, rng, now)
+        _insert_many(ChatLog, chats)
+        _insert_many(Assessment, assessments)
+        _insert_many(Appointment, appointments)
+        _count(chats, assessments, appointments, now)
+    return {'students': max(have, students), 'counsellors': len(counsellor_ids), 'added': len(new_ids)}
@@ -0,0 +1,13 @@
+"""
+URLconf used by benchmarks.load. Same routes as wellness_connect.urls, but the
+app routes come before accounts.urls, whose 'student/' and 'counsellor/'
+dashboard paths otherwise shadow the student and counsellor app dashboards.
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path('student/', include('student.urls')),
+    path('counsellor/', include('counsellor.urls')),
+    path('admin_panel/', include('admin_panel.urls')),
+    path('', include('accounts.urls')),
+]
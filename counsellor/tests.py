@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.alerts import AlertBroker, broker
+from accounts.models import User
+
+from . import views
+
+
+class AlertBrokerTests(TestCase):
+    def test_wait_async_wakes_on_publish_from_another_thread(self):
+        alerts = AlertBroker()
+
+        async def wait():
+            threading.Timer(0.1, alerts.publish, [{'level': 'High'}]).start()
+            started = time.monotonic()
+            events = await alerts.wait_async(0, timeout=10)
+            return events, time.monotonic() - started
+
+        events, waited = asyncio.run(wait())
+        self.assertEqual([e['level'] for e in events], ['High'])
+        self.assertLess(waited, 5)
+
+    def test_wait_async_times_out_empty(self):
+        self.assertEqual(asyncio.run(AlertBroker().wait_async(0, timeout=0.05)), [])
+
+
+class AlertViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('c@example.com', 'C', 'Counsellor', 'pw123456'))
+
+    def test_poll_answers_at_once(self):
+        since = broker.publish({'level': 'Medium'})
+        started = time.monotonic()
+        data = self.client.get(reverse('counsellor:alerts_poll'), {'since': since}).json()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(data['events'], [])
+        self.assertEqual(data['last_id'], since)
+        self.assertIn('retry_ms', data)
+
+    @override_settings(ALERTS_STREAM_SECONDS=0)
+    def test_wsgi_streams_are_capped(self):
+        url = reverse('counsellor:alerts_stream')
+        capacity = views._sync_streams._value
+        responses = [self.client.get(url) for _ in range(capacity)]
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertEqual(self.client.get(url).status_code, 204)  # dashboard falls back to polling
+        for response in responses:
+            response.close()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    @override_settings(ALERTS_STREAM_SECONDS=3)
+    async def test_asgi_stream_delivers_without_waiting_for_the_window(self):
+        user = await sync_to_async(User.objects.get)(email='c@example.com')
+        await sync_to_async(self.async_client.force_login)(user)
+        response = await self.async_client.get(reverse('counsellor:alerts_stream'), {'since': broker.last_id})
+        threading.Timer(0.2, broker.publish, [{'level': 'High'}]).start()
+        started = time.monotonic()
+        async for chunk in response.streaming_content:
+            if b'event: risk' in chunk:
+                break
+        self.assertLess(time.monotonic() - started, 2)
@@ -5,7 +5,13 @@ app_name = 'counsellor'
 
 urlpatterns = [
     path('', views.counsellor_dashboard, name='counsellor_dashboard'),
+    path('students/', views.student_list, name='student_list'),
+    path('students/trends/', views.student_trends, name='student_trends'),
+    path('calendar/', views.calendar_view, name='calendar'),
+    path('alerts/stream/', views.alerts_stream, name='alerts_stream'),
+    path('alerts/poll/', views.alerts_poll, name='alerts_poll'),
     path('appointment/<str:appointment_id>/', views.appointment_update, name='appointment_update'),
     path('student/<int:student_id>/chat/', views.student_chat_history, name='student_chat_history'),
+    path('student/<int:student_id>/chat/page/', views.student_chat_page, name='student_chat_page'),
     path('student/<int:student_id>/schedule/', views.schedule_session_view, name='schedule_session'),
 ]
@@ -1,51 +1,181 @@
 """
 Counsellor: view students by risk, appointment requests, approve/complete, chat history.
 """
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from django.conf import settings
+from django.db.models import Count, Q
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from mongoengine.queryset.visitor import Q as MQ
+from accounts.alerts import broker
 from accounts.models import User
-from student.models import ChatLog, Appointment, Assessment
+from student.models import ChatLog, Appointment
+from student.loaders import latest_assessments_for_users
+from student import stats, trends
+from student.scheduler import scheduler
+from student.slots import appointments_between, default_duration, free_slots_from, has_conflict, parse_start
+from wellness_connect.fragments import bump, cached_fragment
+from wellness_connect.pagination import encode_cursor, decode_cursor
 
 
-def _latest_assessment_for_user(user_id):
-    """Return latest Assessment doc for user_id (MongoDB) or None."""
-    try:
-        return Assessment.objects.filter(user_id=user_id).order_by('-created_at').first()
-    except Exception:
-        try:
-            return Assessment.objects.filter(user_id=user_id).order_by('-date').first()
-        except Exception:
-            return None
+# Risk tiers in display order; the High tier is shown first
+TIERS = ('High', 'Medium', 'Low')
+_TIER_BADGES = {'High': 'badge-danger', 'Medium': 'badge-warning', 'Low': 'badge-success'}
+# Most students one student_trends request may ask for
+TREND_MAX_STUDENTS = 100
 
 
-@login_required
-def counsellor_dashboard(request):
-    if getattr(request.user, 'role', None) != 'Counsellor':
-        messages.warning(request, 'Access denied.')
-        return redirect('accounts:login')
+def _tier_counts():
+    """Number of students per risk tier, from one grouped SQL query."""
+    counts = dict.fromkeys(TIERS, 0)
+    rows = (User.objects.filter(role='Student')
+            .values('current_stress_level')
+            .annotate(n=Count('id')))
+    for row in rows:
+        if row['current_stress_level'] in counts:
+            counts[row['current_stress_level']] = row['n']
+    return counts
+
+
+def _student_page(tier, cursor=None, page_size=None):
+    """
+    One page of students in `tier`, ordered by (-risk_score, name, id).
+    Uses keyset pagination: `cursor` is the sort key of the last row of the
+    previous page, so every page is a bounded index seek.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    page_size = page_size or settings.COUNSELLOR_PAGE_SIZE
+    qs = User.objects.filter(role='Student', current_stress_level=tier)
+    after = decode_cursor(cursor, 3)
+    try:
+        risk, name, last_id = int(after[0]), str(after[1]), int(after[2])
+    except (TypeError, ValueError):
+        after = None
+    if after:
+        qs = qs.filter(
+            Q(risk_score__lt=risk)
+            | Q(risk_score=risk, name__gt=name)
+            | Q(risk_score=risk, name=name, id__gt=last_id)
+        )
+    qs = qs.only('id', 'name', 'risk_score', 'current_stress_level')
+    students = list(qs.order_by('-risk_score', 'name', 'id')[:page_size + 1])
+    next_cursor = None
+    if len(students) > page_size:
+        students = students[:page_size]
+        last = students[-1]
+        next_cursor = encode_cursor([last.risk_score, last.name, last.id])
 
-    students = list(User.objects.filter(role='Student').order_by('-risk_score', 'name'))
-    student_data = []
+    # One Mongo aggregation for the page instead of one query per student
+    latest_by_user = latest_assessments_for_users(u.id for u in students)
+    rows = []
     for u in students:
-        latest = _latest_assessment_for_user(u.id)
-        student_data.append({
+        latest = latest_by_user.get(u.id)
+        rows.append({
             'user': u,
             'latest_phq': getattr(latest, 'phq_score', None) or getattr(latest, 'total_score', None),
             'latest_gad': getattr(latest, 'gad_score', None),
         })
+    return rows, next_cursor
 
-    high_risk = [s for s in student_data if s['user'].current_stress_level == 'High']
-    medium_risk = [s for s in student_data if s['user'].current_stress_level == 'Medium']
-    low_risk = [s for s in student_data if s['user'].current_stress_level == 'Low']
 
-    appointments = list(Appointment.objects.filter(counsellor_id=request.user.id).order_by('-date'))
+def _selected_tier(request):
+    tier = (request.GET.get('tier') or '').strip().capitalize()
+    return tier if tier in TIERS else TIERS[0]
+
+
+@login_required
+def counsellor_dashboard(request):
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        messages.warning(request, 'Access denied.')
+        return redirect('accounts:login')
+
+    tier = _selected_tier(request)
+    after = request.GET.get('after') or ''
+    # Rendered fragments are cached until the data they show changes (wellness_connect.fragments)
+    tier_html = cached_fragment(
+        'counsellor:tier', ('risk', 'assessments', 'users'),
+        lambda: render_to_string('counsellor/_student_tier.html', _tier_context(tier, after)),
+        vary=(tier, after),
+    )
+    appointments_html = cached_fragment(
+        'counsellor:appointments', (f'appointments:{request.user.id}',),
+        lambda: render_to_string('counsellor/_appointments.html', {
+            'appointments': list(Appointment.objects.filter(counsellor_id=request.user.id).order_by('-starts_at')),
+        }, request=request),
+        # The forms embed a CSRF token, so entries are per counsellor and CSRF secret
+        vary=(request.user.id, request.META.get('CSRF_COOKIE', '')),
+    )
 
     return render(request, 'counsellor/counsellor_dashboard.html', {
-        'high_risk_students': high_risk,
-        'medium_risk_students': medium_risk,
-        'low_risk_students': low_risk,
-        'appointments': appointments,
+        'tier_html': tier_html,
+        'appointments_html': appointments_html,
+        'alerts_since': broker.last_id,
+    })
+
+
+def _tier_context(tier, after):
+    students, next_cursor = _student_page(tier, after)
+    counts = _tier_counts()
+    return {
+        'tier': tier,
+        'tier_badge': _TIER_BADGES[tier],
+        'tiers': [{'name': t, 'count': counts[t]} for t in TIERS],
+        'students': students,
+        'next_cursor': next_cursor,
+        'is_first_page': not after,
+    }
+
+
+@login_required
+def student_list(request):
+    """JSON page of students for one risk tier (?tier=High&after=<cursor>)."""
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    tier = _selected_tier(request)
+    students, next_cursor = _student_page(tier, request.GET.get('after'))
+    return JsonResponse({
+        'tier': tier,
+        'students': [{
+            'id': s['user'].id,
+            'name': s['user'].name,
+            'risk_score': s['user'].risk_score,
+            'stress_level': s['user'].current_stress_level,
+            'latest_phq': s['latest_phq'],
+            'latest_gad': s['latest_gad'],
+        } for s in students],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def student_trends(request):
+    """
+    JSON stress sparklines for a page of students (?ids=1,2,3&period=week&count=12),
+    read from the precomputed StressTrend buckets in one query.
+    """
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    period = request.GET.get('period') if request.GET.get('period') in trends.PERIODS else 'week'
+    try:
+        count = min(max(int(request.GET.get('count', 12)), 1), 60)
+        ids = [int(i) for i in (request.GET.get('ids') or '').split(',') if i.strip()][:TREND_MAX_STUDENTS]
+    except ValueError:
+        return JsonResponse({'error': 'ids and count must be integers'}, status=400)
+    starts, by_user = trends.sparklines(ids, period, count)
+    return JsonResponse({
+        'period': period,
+        'starts': [s.date().isoformat() for s in starts],
+        'students': {str(uid): values for uid, values in by_user.items()},
     })
 
 
@@ -62,18 +192,57 @@ def appointment_update(request, appointment_id):
         return redirect('counsellor:counsellor_dashboard')
 
     try:
-        from bson.objectid import ObjectId
         app = Appointment.objects.get(id=ObjectId(appointment_id), counsellor_id=request.user.id)
     except (Appointment.DoesNotExist, Exception):
         messages.error(request, 'Appointment not found.')
         return redirect('counsellor:counsellor_dashboard')
 
+    old_status = app.status
     app.status = status
     app.save()
+    stats.record_appointment_status(old_status, status)
+    scheduler.record_status_change(app.date, app.counsellor_id, old_status, status)
+    bump('appointments', f'appointments:{app.counsellor_id}')
     messages.success(request, f'Appointment marked as {status}.')
     return redirect('counsellor:counsellor_dashboard')
 
 
+def _chat_page(student_id, cursor=None, page_size=None):
+    """
+    One page of a student's chat logs, newest first, ordered by (timestamp, _id).
+    Keyset pagination over the (user_id, -timestamp, -_id) index, fetching only
+    the displayed fields. Returns (rows, next_cursor).
+    """
+    page_size = page_size or settings.CHAT_HISTORY_PAGE_SIZE
+    query = MQ(user_id=student_id)
+    after = decode_cursor(cursor, 2)
+    try:
+        ts, last_id = datetime.fromisoformat(after[0]), ObjectId(after[1])
+    except (TypeError, ValueError, InvalidId):
+        after = None
+    if after:
+        query &= MQ(timestamp__lt=ts) | MQ(timestamp=ts, id__lt=last_id)
+    docs = list(
+        ChatLog.objects(query)
+        .only('timestamp', 'message', 'response', 'stress_level')
+        .order_by('-timestamp', '-id')
+        .limit(page_size + 1)
+        .as_pymongo()
+    )
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        last = docs[-1]
+        next_cursor = encode_cursor([last['timestamp'].isoformat(), str(last['_id'])])
+    rows = [{
+        'timestamp': d['timestamp'],
+        'message': d.get('message', ''),
+        'response': d.get('response', ''),
+        'stress_level': d.get('stress_level', ''),
+    } for d in docs]
+    return rows, next_cursor
+
+
 @login_required
 def student_chat_history(request, student_id):
     if getattr(request.user, 'role', None) != 'Counsellor':
@@ -83,10 +252,26 @@ def student_chat_history(request, student_id):
     except User.DoesNotExist:
         messages.error(request, 'Student not found.')
         return redirect('counsellor:counsellor_dashboard')
-    logs = list(ChatLog.objects.filter(user_id=student_id).order_by('-timestamp'))
+    # First page is rendered inline; older pages are fetched from student_chat_page
+    logs, next_cursor = _chat_page(student_id)
     return render(request, 'counsellor/chat_history.html', {
         'student': student,
         'chat_logs': logs,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def student_chat_page(request, student_id):
+    """JSON page of a student's chat history (?after=<cursor>)."""
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    if not User.objects.filter(id=student_id, role='Student').exists():
+        return JsonResponse({'error': 'Student not found'}, status=404)
+    logs, next_cursor = _chat_page(student_id, request.GET.get('after'))
+    return JsonResponse({
+        'chat_logs': [dict(log, timestamp=log['timestamp'].strftime('%Y-%m-%d %H:%M')) for log in logs],
+        'next_cursor': next_cursor,
     })
 
 
@@ -101,14 +286,148 @@ def schedule_session_view(request, student_id):
         return redirect('counsellor:counsellor_dashboard')
     if request.method == 'POST':
         date = (request.POST.get('date') or '').strip()
-        if date:
+        starts_at = parse_start(date, (request.POST.get('time') or '').strip()) if date else None
+        if starts_at is None:
+            messages.error(request, 'Please select a date.')
+        elif has_conflict(request.user.id, starts_at):
+            messages.error(request, 'You already have an appointment at that time.')
+        else:
+            date = starts_at.date().isoformat()
             Appointment(
                 student_id=student_id,
                 counsellor_id=request.user.id,
                 date=date,
                 status='Pending',
+                starts_at=starts_at,
+                duration_minutes=default_duration(),
             ).save()
+            scheduler.record_booking(date, request.user.id)
+            stats.record_appointment_status(None, 'Pending')
+            bump('appointments', f'appointments:{request.user.id}')
             messages.success(request, f'Session scheduled for {student.name}.')
             return redirect('counsellor:counsellor_dashboard')
-        messages.error(request, 'Please select a date.')
     return render(request, 'counsellor/schedule_session.html', {'student': student})
+
+
+@login_required
+def calendar_view(request):
+    """Counsellor's appointments and free slots for ?start=YYYY-MM-DD&days=7 (one range query)."""
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return redirect('accounts:login')
+    start = parse_start(request.GET.get('start') or '', '00:00')
+    if start is None:
+        start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), 31)
+    except ValueError:
+        days = 7
+    end = start + timedelta(days=days)
+
+    appointments = appointments_between(request.user.id, start, end)
+    slots = free_slots_from(appointments, start, end)
+    calendar = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).date()
+        calendar.append({
+            'day': day,
+            'appointments': [a for a in appointments if a.starts_at.date() == day],
+            'free_slots': [s for s in slots if s.date() == day],
+        })
+    return render(request, 'counsellor/calendar.html', {
+        'calendar': calendar,
+        'previous_start': (start - timedelta(days=days)).date().isoformat(),
+        'next_start': end.date().isoformat(),
+        'days': days,
+    })
+
+
+def _alerts_since(request):
+    try:
+        return int(request.headers.get('Last-Event-ID') or request.GET.get('since') or broker.last_id)
+    except ValueError:
+        return broker.last_id
+
+
+def _frames(events):
+    return ''.join(f"id: {e['id']}\nevent: risk\ndata: {json.dumps(e)}\n\n" for e in events)
+
+
+def _alert_events(last_id):
+    """
+    SSE frames for risk-level changes under WSGI; ends after ALERTS_STREAM_SECONDS
+    (EventSource reconnects). Blocks its worker thread for as long as it runs.
+    """
+    deadline = time.monotonic() + settings.ALERTS_STREAM_SECONDS
+    yield 'retry: 2000\n\n'
+    while time.monotonic() < deadline:
+        events = broker.wait(last_id, timeout=min(15, max(0, deadline - time.monotonic())))
+        if events:
+            last_id = events[-1]['id']
+        yield _frames(events) or ': keepalive\n\n'
+
+
+async def _alert_events_async(last_id):
+    """_alert_events under ASGI: awaits the broker on the event loop, so no thread is held."""
+    deadline = time.monotonic() + settings.ALERTS_STREAM_SECONDS
+    yield 'retry: 2000\n\n'
+    while time.monotonic() < deadline:
+        events = await broker.wait_async(last_id, timeout=min(15, max(0, deadline - time.monotonic())))
+        if events:
+            last_id = events[-1]['id']
+        yield _frames(events) or ': keepalive\n\n'
+
+
+# Open WSGI streams in this process; each one pins a worker thread
+_sync_streams = threading.BoundedSemaphore(settings.ALERTS_SYNC_STREAMS)
+
+
+class _SyncAlertStream:
+    """WSGI stream body holding one _sync_streams slot until the server closes the response."""
+
+    def __init__(self, last_id):
+        self._frames = _alert_events(last_id)
+        self._open = True
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self._frames.close()
+            _sync_streams.release()
+
+
+@login_required
+def alerts_stream(request):
+    """
+    Server-Sent Events stream of student risk-level changes. Under WSGI at most
+    ALERTS_SYNC_STREAMS run at once; beyond that the answer is 204, which stops
+    EventSource and makes the dashboard fall back to alerts_poll.
+    """
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    since = _alerts_since(request)
+    if isinstance(request, ASGIRequest):
+        events = _alert_events_async(since)
+    elif _sync_streams.acquire(blocking=False):
+        events = _SyncAlertStream(since)
+    else:
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def alerts_poll(request):
+    """Short-poll fallback: changes after ?since=<id>, answered at once (no thread is held)."""
+    if getattr(request.user, 'role', None) != 'Counsellor':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    events = broker.wait(_alerts_since(request), timeout=0)
+    return JsonResponse({
+        'events': events,
+        'last_id': events[-1]['id'] if events else broker.last_id,
+        'retry_ms': settings.ALERTS_POLL_SECONDS * 1000,
+    })
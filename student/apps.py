@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class StudentConfig(AppConfig):
+    name = 'student'
+
+    def ready(self):
+        from wellness_connect.mongo import connect
+        from .scheduler import connect_signals
+        connect()
+        connect_signals()
@@ -0,0 +1,57 @@
+"""
+Async chatbot send view, served under ASGI (wellness_connect/asgi.py).
+The ChatLog insert (async Mongo driver), the risk update (SQLite, via the ORM)
+and the stats and trend updates run concurrently instead of one after another.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from accounts.risk_engine import update_user_risk
+from wellness_connect.mongo import get_async_db
+
+from . import classification_service, stats, trends
+from .models import ChatLog
+from .views import _chat_payload, _response_for_stress
+
+
+def _authenticated_user(request):
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+async def chatbot_send(request):
+    """Async version of student.views.chatbot_send (same request and response)."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    if getattr(user, 'role', None) != 'Student':
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    msg = (request.POST.get('message') or '').strip()
+    if not msg:
+        return JsonResponse({'response': 'Please type a message.', 'stress_level': 'Low'})
+
+    stress = await classification_service.aclassify(msg)
+    response_text = _response_for_stress(stress)
+
+    doc = ChatLog(
+        user_id=user.id,
+        message=msg,
+        response=response_text,
+        stress_level=stress
+    )
+    doc.validate()
+    chat_logs = get_async_db()[ChatLog._get_collection_name()]
+
+    # ORM writes stay on Django's sync thread; pymongo's sync client is thread-safe
+    _, final_level, _, _ = await asyncio.gather(
+        chat_logs.insert_one(doc.to_mongo().to_dict()),
+        sync_to_async(update_user_risk)(user, chat_level=stress),
+        sync_to_async(stats.record_chat, thread_sensitive=False)(user.id, stress),
+        sync_to_async(trends.record_chat, thread_sensitive=False)(user.id, stress),
+    )
+    return JsonResponse(_chat_payload(stress, final_level, response_text))
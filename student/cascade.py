@@ -0,0 +1,203 @@
+"""
+Cascade deletion of a deleted user's MongoDB documents.
+admin_panel.views.user_delete only removes the SQLite row and calls enqueue();
+a CascadeJob is stored and an in-process worker thread removes the user's chat
+logs, assessments, appointments (as student or counsellor), roll-ups, risk state
+and high-risk marker in batches of CASCADE_BATCH_SIZE, pausing between batches
+so the deletes never monopolise the database. Admin stats counters are
+decremented by the number of documents each delete actually removed, so two
+workers racing over the same documents never count one twice.
+A claimed job carries a lease token; the worker refreshes its heartbeat before
+every batch and stops if another worker has taken the job over. Jobs whose
+heartbeat is older than STALE_AFTER (a crashed process) are picked up again by
+the next worker or by `manage.py sweep_orphans`; failed jobs are retried with
+exponential backoff (CASCADE_RETRY_SECONDS, CASCADE_MAX_ATTEMPTS).
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from wellness_connect.fragments import bump
+
+from . import stats
+from .models import Appointment, Assessment, CascadeJob, ChatDaily, ChatLog, HighRiskUser, RiskState, StressTrend
+from .scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+# (model, field holding the user id); every place a user's id is stored in MongoDB
+TARGETS = [
+    (ChatLog, 'user_id'),
+    (ChatDaily, 'user_id'),
+    (Assessment, 'user_id'),
+    (Appointment, 'student_id'),
+    (Appointment, 'counsellor_id'),
+    (RiskState, '_id'),
+    (HighRiskUser, '_id'),
+    (StressTrend, 'user_id'),
+]
+# A 'running' job whose heartbeat is older than this is assumed abandoned by a dead process
+STALE_AFTER = timedelta(minutes=10)
+
+
+class LeaseLost(Exception):
+    """Another worker has taken over the cascade job."""
+
+
+def _stats_key(model, doc):
+    """Documents with the same key are counted the same way by stats (and the scheduler)."""
+    if model is Appointment:
+        return doc.get('status'), doc.get('date'), doc.get('counsellor_id')
+    if model is Assessment:
+        return doc.get('stress_level')
+    return None
+
+
+def _record_removed(model, key, n):
+    """Update stats, scheduler loads and caches for `n` removed documents sharing `key`."""
+    if model is Appointment:
+        status, date, counsellor_id = key
+        stats.record_deleted(appointment_statuses={status: n})
+        for _ in range(n):
+            scheduler.record_status_change(date, counsellor_id, status, None)
+        bump('appointments', f'appointments:{counsellor_id}')
+    elif model is Assessment:
+        stats.record_deleted(assessment_levels={key: n})
+        bump('assessments')
+    elif model is HighRiskUser:
+        stats.record_deleted(high_risk_users=n)
+
+
+def _delete_batches(model, field, user_id, batch_size, pause, heartbeat=None):
+    """
+    Delete model documents with field == user_id in batches; returns how many were
+    removed. `heartbeat` is called before every batch (it raises LeaseLost to stop).
+    """
+    collection = model._get_collection()
+    removed = 0
+    while True:
+        if heartbeat:
+            heartbeat()
+        batch = list(collection.find({field: user_id}, {'status': 1, 'stress_level': 1, 'date': 1, 'counsellor_id': 1})
+                     .limit(batch_size))
+        if not batch:
+            return removed
+        groups = defaultdict(list)
+        for doc in batch:
+            groups[_stats_key(model, doc)].append(doc['_id'])
+        for key, ids in groups.items():
+            # Only what this delete removed is counted; a racing worker counts the rest
+            n = collection.delete_many({'_id': {'$in': ids}}).deleted_count
+            removed += n
+            if n:
+                _record_removed(model, key, n)
+        if len(batch) == batch_size and pause:
+            time.sleep(pause)
+
+
+def delete_user_documents(user_id, batch_size=None, pause=None, heartbeat=None):
+    """Remove every MongoDB document of `user_id`. Returns {'collection:field': removed}."""
+    batch_size = batch_size or settings.CASCADE_BATCH_SIZE
+    pause = settings.CASCADE_BATCH_PAUSE_SECONDS if pause is None else pause
+    return {
+        f'{model._get_collection_name()}:{field}': _delete_batches(
+            model, field, int(user_id), batch_size, pause, heartbeat)
+        for model, field in TARGETS
+    }
+
+
+def _claim(now=None):
+    """Atomically take the oldest runnable (or abandoned) job under a new lease, or None."""
+    now = now or datetime.utcnow()
+    return CascadeJob._get_collection().find_one_and_update(
+        {'$or': [
+            {'status': 'pending', 'retry_at': None},
+            {'status': 'pending', 'retry_at': {'$lte': now}},
+            {'status': 'running', 'heartbeat_at': {'$lt': now - STALE_AFTER}},
+        ]},
+        {'$set': {'status': 'running', 'started_at': now, 'heartbeat_at': now, 'lease': uuid.uuid4().hex}},
+        sort=[('created_at', 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _heartbeat(job):
+    def beat():
+        owned = CascadeJob._get_collection().update_one(
+            {'_id': job['_id'], 'lease': job['lease']}, {'$set': {'heartbeat_at': datetime.utcnow()}})
+        if not owned.matched_count:
+            raise LeaseLost(job['_id'])
+    return beat
+
+
+def run_pending():
+    """Process runnable jobs until none is left. Returns how many were processed."""
+    jobs = CascadeJob._get_collection()
+    done = 0
+    while True:
+        job = _claim()
+        if job is None:
+            return done
+        owned = {'_id': job['_id'], 'lease': job['lease']}  # later updates only while the lease is ours
+        now = datetime.utcnow()
+        try:
+            deleted = delete_user_documents(job['user_id'], heartbeat=_heartbeat(job))
+        except LeaseLost:
+            logger.warning('Cascade job for user %s was taken over by another worker', job['user_id'])
+            continue
+        except Exception as exc:
+            logger.exception('Cascade deletion of user %s failed', job['user_id'])
+            attempts = job.get('attempts', 0) + 1
+            update = {'attempts': attempts, 'error': f'{type(exc).__name__}: {exc}'}
+            if attempts < settings.CASCADE_MAX_ATTEMPTS:
+                delay = settings.CASCADE_RETRY_SECONDS * 2 ** (attempts - 1)
+                update.update(status='pending', retry_at=now + timedelta(seconds=delay))
+            else:
+                update.update(status='failed', finished_at=now)
+            jobs.update_one(owned, {'$set': update})
+        else:
+            jobs.update_one(owned, {'$set': {
+                'status': 'done', 'deleted': deleted,
+                'finished_at': datetime.utcnow(),
+            }})
+        done += 1
+
+
+class _Worker:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def notify(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cascade-worker', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.CASCADE_RETRY_SECONDS)  # also picks up jobs due for a retry
+            self._wake.clear()
+            try:
+                run_pending()
+            except Exception:
+                logger.exception('Cascade worker failed; pending jobs are retried on the next wake-up')
+
+
+worker = _Worker()
+
+
+def enqueue(user_id):
+    """Queue deletion of a (just deleted) user's documents and wake the worker."""
+    job = CascadeJob(user_id=int(user_id))
+    job.save()
+    worker.notify()
+    return job
@@ -0,0 +1,316 @@
+"""
+Chat message classification with a bag-of-words model in a process pool.
+When settings.STRESS_MODEL_PATH names a model file (see BagOfWordsModel;
+`manage.py train_stress_model` writes one), classify() hands each message to a
+ClassificationService: a batcher thread gathers the messages that arrive within
+STRESS_BATCH_WINDOW_MS (at most STRESS_BATCH_MAX) and sends them to one of
+STRESS_MODEL_WORKERS processes, each of which loads the model once. The view
+waits on a future for at most STRESS_MODEL_TIMEOUT_MS, then falls back to the
+keyword rules (student.classifier), as it does when the pool fails, and
+cancels the message. A broken pool is shut down and respawned with backoff;
+a model file that does not load disables the model (see get_service()). At most STRESS_QUEUE_MAX messages wait for the model at
+once; beyond that classify() uses the keyword rules straight away, so a slow
+pool cannot build an unbounded backlog. warm() starts the workers when the
+server loads the app (wsgi.py / asgi.py), so the first chats do not wait for
+the processes to spawn and load the model.
+A keyword 'High' (self-harm terms) is returned at once and never downgraded by
+the model. Without STRESS_MODEL_PATH only the keyword rules are used.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import classifier
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r'\w+')
+# After a worker dies the pool is respawned after 1 s, doubling per breakage up to a minute
+POOL_RETRY_SECONDS = 1
+POOL_RETRY_MAX_SECONDS = 60
+
+
+class BagOfWordsModel:
+    """
+    Linear bag-of-words model: the score of each label is its bias plus the
+    weights of every known token in the message; the best-scoring label wins.
+    Stored as JSON: {"labels": [...], "vocabulary": [token, ...],
+    "weights": [[weight per label] per token], "bias": [per label]}.
+    """
+
+    def __init__(self, labels, vocabulary, weights, bias):
+        import numpy as np
+
+        self.labels = list(labels)
+        self.vocabulary = {token: i for i, token in enumerate(vocabulary)}
+        self.weights = np.asarray(weights, dtype=np.float64).reshape(len(self.vocabulary), len(self.labels))
+        self.bias = np.asarray(bias, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['labels'], data['vocabulary'], data['weights'], data['bias'])
+
+    def save(self, path):
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'labels': self.labels,
+                'vocabulary': vocabulary,
+                'weights': self.weights.round(6).tolist(),
+                'bias': self.bias.round(6).tolist(),
+            }, f)
+
+    def predict(self, texts):
+        """Labels for a batch of texts, scored together in one array."""
+        import numpy as np
+
+        rows, cols = [], []
+        for i, text in enumerate(texts):
+            for token in TOKEN.findall((text or '').lower()):
+                j = self.vocabulary.get(token)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+        scores = np.tile(self.bias, (len(texts), 1))
+        if rows:
+            np.add.at(scores, np.array(rows), self.weights[cols])
+        return [self.labels[k] for k in scores.argmax(axis=1).tolist()]
+
+
+# Worker process side: the model is loaded once by the pool initializer
+_worker_model = None
+
+
+def _load_worker_model(path):
+    global _worker_model
+    _worker_model = BagOfWordsModel.load(path)
+
+
+def _predict_batch(texts):
+    return _worker_model.predict(texts)
+
+
+class PoolBackingOff(RuntimeError):
+    """The worker pool broke recently and is not respawned until its backoff ends."""
+
+
+class ClassificationService:
+    """Micro-batches messages to a process pool; submit() returns a Future of the level."""
+
+    def __init__(self, model_path, workers=2, window=0.01, max_batch=64, max_pending=256):
+        self.model_path = model_path
+        self.workers = workers
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._queue = None
+        self._slots = None
+        self._thread = None
+        self._pool = None
+        self._pid = None  # the batcher thread and pool belong to this process only
+        self._failures = 0  # pools broken in a row
+        self._retry_at = 0.0  # time.monotonic() before which no new pool is started
+
+    def submit(self, text):
+        """Raises queue.Full when max_pending messages are already waiting."""
+        pending, slots = self._started()
+        if not slots.acquire(blocking=False):
+            raise queue.Full
+        future = Future()
+        future.add_done_callback(lambda _: slots.release())  # also on cancel() and failures
+        pending.put((text, future))
+        return future
+
+    def warm(self):
+        """Start the batcher and one busy worker per process slot, each loading the model."""
+        self._started()
+        pool = self._get_pool()
+        return [pool.submit(_predict_batch, ['']) for _ in range(self.workers)]
+
+    def _started(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.SimpleQueue()
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pool = None
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name='stress-batcher', daemon=True)
+                self._thread.start()
+            return self._queue, self._slots
+
+    def _get_pool(self):
+        with self._pool_lock:  # the batcher thread and warm() may both start it
+            if self._pool is None:
+                if time.monotonic() < self._retry_at:
+                    raise PoolBackingOff(f'stress model pool broke {self._failures} time(s) in a row')
+                # spawn: forking a threaded web worker is unsafe, and the workers need no Django state
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_load_worker_model, initargs=(self.model_path,),
+                )
+            return self._pool
+
+    def _run(self, pending):
+        while True:
+            item = pending.get()
+            if item is None:  # shutdown()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        # Drop futures whose caller already gave up (cancelled by asyncio.wait_for)
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        futures = [future for _, future in batch]
+        try:
+            pool = self._get_pool()
+            result = pool.submit(_predict_batch, [text for text, _ in batch])
+        except Exception as exc:
+            self._fail(futures, exc)
+            return
+        result.add_done_callback(lambda done: self._deliver(done, futures, pool))
+
+    def _deliver(self, done, futures, pool):
+        try:
+            levels = done.result()
+        except Exception as exc:
+            self._fail(futures, exc, pool)
+            return
+        self._failures = 0
+        for future, level in zip(futures, levels):
+            future.set_result(level)
+
+    def _fail(self, futures, exc, pool=None):
+        if isinstance(exc, BrokenProcessPool):
+            self._discard(pool)
+        if not isinstance(exc, PoolBackingOff):  # logged once, when the pool broke
+            logger.warning('Stress model batch of %d failed: %r', len(futures), exc)
+        for future in futures:
+            future.set_exception(exc)
+
+    def _discard(self, pool):
+        """A worker died: shut the pool down and start a fresh one only after a backoff."""
+        with self._pool_lock:
+            if pool is None or pool is not self._pool:
+                return  # another batch of the same pool already did
+            self._pool = None
+            self._failures += 1
+            self._retry_at = time.monotonic() + min(
+                POOL_RETRY_MAX_SECONDS, POOL_RETRY_SECONDS * 2 ** (self._failures - 1))
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the batcher once it has dispatched what is queued, then the pool."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None  # a later submit() starts afresh
+            self._queue.put(None)
+            thread = self._thread
+        thread.join(timeout=5)
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """
+    The process-wide service for settings.STRESS_MODEL_PATH, or None when no model
+    is configured. The model is loaded once here first: when it is missing or
+    corrupt the error is logged and only the keyword rules are used until restart,
+    instead of every batch starting worker processes that die at once.
+    """
+    global _service
+    path = getattr(settings, 'STRESS_MODEL_PATH', '')
+    if not path:
+        return None
+    with _service_lock:
+        if _service is None:
+            try:
+                BagOfWordsModel.load(path)
+            except Exception as exc:
+                logger.error('Stress model %s cannot be loaded, using keyword rules only: %r', path, exc)
+                _service = False
+            else:
+                _service = ClassificationService(
+                    path, settings.STRESS_MODEL_WORKERS,
+                    settings.STRESS_BATCH_WINDOW_MS / 1000, settings.STRESS_BATCH_MAX,
+                    settings.STRESS_QUEUE_MAX,
+                )
+                atexit.register(_service.shutdown)
+    return _service or None
+
+
+def warm():
+    """Start the model workers now if a model is configured; called by the server entry points."""
+    service = get_service()
+    if service is not None:
+        service.warm()
+
+
+def classify(text):
+    """'High', 'Medium' or 'Low' for a chat message; blocks for at most STRESS_MODEL_TIMEOUT_MS."""
+    keyword_level = classifier.classify(text)
+    service = get_service()
+    if service is None or keyword_level == 'High':
+        return keyword_level
+    try:
+        future = service.submit(text)
+    except queue.Full:
+        return keyword_level
+    try:
+        return future.result(timeout=settings.STRESS_MODEL_TIMEOUT_MS / 1000)
+    except Exception:
+        future.cancel()  # timed out: the batcher skips it if it is still queued
+        return keyword_level  # or the pool failed (logged by the service)
+
+
+async def aclassify(text):
+    """classify() for async views: awaits the model without blocking the event loop."""
+    keyword_level = classifier.classify(text)
+    service = get_service()
+    if service is None or keyword_level == 'High':
+        return keyword_level
+    try:
+        # wait_for cancels the wrapped future on timeout, which cancels the submitted one
+        return await asyncio.wait_for(
+            asyncio.wrap_future(service.submit(text)), settings.STRESS_MODEL_TIMEOUT_MS / 1000,
+        )
+    except Exception:
+        return keyword_level  # timed out, queue full or the pool failed
@@ -0,0 +1,100 @@
+"""
+Keyword-based stress classifier for chat messages.
+The lexicon (keywords per level) is compiled once into a single regex built
+from a character trie, so matching cost grows with message length, not with
+the number of keywords. Keywords match whole words only ('sad' does not match
+'sadness'); a trailing '*' matches any word starting with the prefix
+('suicid*' matches 'suicide', 'suicidal'); spaces match any whitespace.
+Override the lexicon with settings.STRESS_KEYWORDS = {'High': [...], 'Medium': [...]}.
+"""
+import re
+
+# Levels checked in priority order; a message with no keyword is 'Low'
+LEVELS = ('High', 'Medium')
+DEFAULT_LEVEL = 'Low'
+
+DEFAULT_KEYWORDS = {
+    'High': ['suicid*'],
+    'Medium': ['sad', 'sadness', 'anxiety', 'anxious', 'depressed'],
+}
+
+_EXACT = ''
+_PREFIX = '*'
+
+
+def _build_trie(terms):
+    trie = {}
+    for term in terms:
+        term = ' '.join((term or '').lower().split())
+        prefix = term.endswith(_PREFIX)
+        term = term.rstrip(_PREFIX).strip()
+        if not term:
+            continue
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[_PREFIX if prefix else _EXACT] = True
+    return trie
+
+
+def _trie_pattern(node):
+    alternatives = []
+    for ch in sorted(k for k in node if k not in (_EXACT, _PREFIX)):
+        head = r'\s+' if ch == ' ' else re.escape(ch)
+        alternatives.append(head + _trie_pattern(node[ch]))
+    if _PREFIX in node:
+        alternatives.append('')
+    elif _EXACT in node:
+        alternatives.append(r'(?!\w)')
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+
+class StressClassifier:
+    """Classify text as 'High', 'Medium' or 'Low' from a compiled keyword lexicon."""
+
+    def __init__(self, keywords=None):
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        groups = []
+        for level in LEVELS:
+            trie = _build_trie(keywords.get(level, ()))
+            if trie:
+                groups.append(f'(?P<{level}>{_trie_pattern(trie)})')
+        self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(groups) + ')', re.IGNORECASE) if groups else None
+
+    def classify(self, text):
+        """Return the highest level whose keyword appears in text."""
+        if not text or self.pattern is None:
+            return DEFAULT_LEVEL
+        best = len(LEVELS)
+        for match in self.pattern.finditer(text):
+            rank = LEVELS.index(match.lastgroup)
+            if rank == 0:
+                return LEVELS[0]
+            best = min(best, rank)
+        return LEVELS[best] if best < len(LEVELS) else DEFAULT_LEVEL
+
+    def classify_many(self, texts):
+        """Classify an iterable of texts; returns a list of levels in the same order."""
+        return [self.classify(text) for text in texts]
+
+
+_classifier = None
+
+
+def get_classifier():
+    """The process-wide classifier built from settings.STRESS_KEYWORDS."""
+    global _classifier
+    if _classifier is None:
+        from django.conf import settings
+        _classifier = StressClassifier(getattr(settings, 'STRESS_KEYWORDS', None))
+    return _classifier
+
+
+def classify(text):
+    return get_classifier().classify(text)
+
+
+def classify_many(texts):
+    return get_classifier().classify_many(texts)
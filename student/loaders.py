@@ -0,0 +1,41 @@
+"""
+Batched loaders that join Django User rows to MongoDB documents.
+Use these from views instead of querying Mongo once per user: each loader
+sends one aggregation no matter how many user ids it is given.
+"""
+from .models import Assessment, ChatLog
+
+
+def latest_assessments_for_users(user_ids):
+    """
+    Return {user_id: Assessment} with the latest assessment of each user.
+    Users without any assessment are missing from the result.
+    """
+    ids = list({int(uid) for uid in user_ids})
+    if not ids:
+        return {}
+    pipeline = [
+        {'$match': {'user_id': {'$in': ids}}},
+        {'$sort': {'user_id': 1, 'created_at': -1, 'date': -1}},
+        {'$group': {'_id': '$user_id', 'doc': {'$first': '$$ROOT'}}},
+    ]
+    latest = {}
+    for row in Assessment.objects.aggregate(pipeline, allowDiskUse=True):
+        latest[row['_id']] = Assessment._from_son(row['doc'])
+    return latest
+
+
+def latest_chat_levels_for_users(user_ids):
+    """
+    Return {user_id: stress_level} from the latest ChatLog of each user.
+    Users without any chat log are missing from the result.
+    """
+    ids = list({int(uid) for uid in user_ids})
+    if not ids:
+        return {}
+    pipeline = [
+        {'$match': {'user_id': {'$in': ids}}},
+        {'$sort': {'user_id': 1, 'timestamp': -1, '_id': -1}},
+        {'$group': {'_id': '$user_id', 'stress_level': {'$first': '$stress_level'}}},
+    ]
+    return {row['_id']: row['stress_level'] for row in ChatLog.objects.aggregate(pipeline, allowDiskUse=True)}
@@ -0,0 +1,25 @@
+"""
+Rebuild the per-student stress trend buckets (StressTrend) from stored history.
+Usage: python manage.py backfill_trends [--user ID ...] [--chunk-size 500]
+Run once after deploying student/trends.py, and again after restoring data.
+Live updates keep the buckets current afterwards.
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from student import trends
+from student.models import StressTrend
+
+
+class Command(BaseCommand):
+    help = 'Backfill per-student daily and weekly stress trend buckets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='only these user ids (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='students read per aggregation')
+
+    def handle(self, *args, **options):
+        StressTrend.ensure_indexes()  # the upserts rely on the unique bucket key
+        user_ids = options['user'] or User.objects.filter(role='Student').order_by('id').values_list('id', flat=True)
+        written = trends.backfill(user_ids, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'{written} trend buckets written.'))
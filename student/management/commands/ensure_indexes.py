@@ -0,0 +1,113 @@
+"""
+Create/verify the MongoDB indexes declared in student/models.py, then explain()
+every hot query the views run and fail if any of them is still a COLLSCAN.
+Usage: python manage.py ensure_indexes [--no-explain]
+Run it before deploying so index regressions are caught early.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.models import ChatLog, ChatDaily, Assessment, Appointment, StatsCounter, HighRiskUser, CascadeJob, StressTrend
+
+MODELS = (ChatLog, ChatDaily, Assessment, Appointment, StatsCounter, HighRiskUser, CascadeJob, StressTrend)
+
+# Sample values only shape the plan; the collections may be empty.
+_SAMPLE_USER = 1
+
+
+def _find(model, query, sort=None, limit=0):
+    cursor = model._get_collection().find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor.explain()
+
+
+def _aggregate(model, pipeline):
+    collection = model._get_collection()
+    return collection.database.command(
+        'aggregate', collection.name, pipeline=pipeline, explain=True,
+    )
+
+
+# (name, callable returning explain output); one entry per query pattern the views run
+HOT_QUERIES = [
+    ('counsellor:student_chat_page', lambda: _find(
+        ChatLog, {'user_id': _SAMPLE_USER}, [('timestamp', -1), ('_id', -1)], limit=51)),
+    ('loaders.latest_assessments_for_users', lambda: _aggregate(Assessment, [
+        {'$match': {'user_id': {'$in': [_SAMPLE_USER, _SAMPLE_USER + 1]}}},
+        {'$sort': {'user_id': 1, 'created_at': -1, 'date': -1}},
+        {'$group': {'_id': '$user_id', 'doc': {'$first': '$$ROOT'}}},
+    ])),
+    ('counsellor:counsellor_dashboard appointments', lambda: _find(
+        Appointment, {'counsellor_id': _SAMPLE_USER}, [('starts_at', -1)])),
+    ('slots.appointments_between', lambda: _find(
+        Appointment, {'counsellor_id': _SAMPLE_USER, 'starts_at': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 1, 8)}},
+        [('starts_at', 1)])),
+    ('stats high-risk assessments', lambda: _find(Assessment, {'stress_level': 'High'})),
+    ('stats high-risk chat logs', lambda: _find(ChatLog, {'stress_level': 'High'})),
+    ('trends.sparklines', lambda: _find(
+        StressTrend, {'user_id': {'$in': [_SAMPLE_USER, _SAMPLE_USER + 1]}, 'period': 'week',
+                      'start': {'$gte': datetime(2024, 1, 1)}})),
+]
+
+
+def _stages(plan):
+    """Yield every 'stage' name anywhere in an explain() document."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def _winning_plans(explain):
+    """Only look at the chosen plans, not rejected candidates."""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'rejectedPlans':
+                continue
+            if key in ('winningPlan', 'queryPlan'):
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for item in explain:
+            yield from _winning_plans(item)
+
+
+class Command(BaseCommand):
+    help = 'Create/verify MongoDB indexes and fail if any hot query is a collection scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-explain', action='store_true', help='Only create indexes.')
+
+    def handle(self, *args, **options):
+        for model in MODELS:
+            model.ensure_indexes()
+            names = sorted(model._get_collection().index_information())
+            self.stdout.write(f'{model._get_collection_name()}: {", ".join(names)}')
+
+        if options['no_explain']:
+            return
+
+        scans = []
+        for name, explain in HOT_QUERIES:
+            stages = set()
+            for plan in _winning_plans(explain()):
+                stages.update(_stages(plan))
+            label = ', '.join(sorted(stages)) or 'no plan'
+            if 'COLLSCAN' in stages:
+                scans.append(name)
+                self.stdout.write(self.style.ERROR(f'COLLSCAN  {name} [{label}]'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok        {name} [{label}]'))
+
+        if scans:
+            raise CommandError(f'{len(scans)} hot query(ies) use a collection scan: {", ".join(scans)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
@@ -0,0 +1,212 @@
+"""
+Stream chat logs, assessments and appointments to NDJSON or CSV files.
+Usage: python manage.py export_data [chat_logs assessments appointments]
+           [--format ndjson|csv] [--gzip] [--output-dir DIR]
+           [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--user ID ...]
+           [--batch-size 1000] [--checkpoint-every 50000] [--resume]
+Documents are read in _id order from one batched server-side cursor (preferring
+a secondary when there is one) and written a batch at a time, so memory use does
+not grow with the collection. Every --checkpoint-every documents the file is
+flushed and <file>.checkpoint.json records the last _id and the file offset;
+--resume continues an interrupted export from there. Gzip files are written as
+one gzip member per checkpoint, which every gzip reader concatenates.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import ReadPreference
+from pymongo.errors import CursorNotFound
+
+from student.models import Appointment, Assessment, ChatLog
+
+# name -> (model, date field for --since/--until, user id fields for --user)
+EXPORTS = {
+    'chat_logs': (ChatLog, 'timestamp', ('user_id',)),
+    'assessments': (Assessment, 'created_at', ('user_id',)),
+    'appointments': (Appointment, 'starts_at', ('student_id', 'counsellor_id')),
+}
+
+
+def _plain(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot export {type(value).__name__}')
+
+
+def _columns(model):
+    return ['_id'] + [f.db_field for name, f in model._fields.items() if name != 'id']
+
+
+def _csv_rows(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)  # None becomes an empty field
+    return buf.getvalue()
+
+
+def _day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}; use YYYY-MM-DD.')
+
+
+class _Output:
+    """Append-only export file that can be cut back to its last checkpoint."""
+
+    def __init__(self, path, compress, offset=None):
+        self.compress = compress
+        if offset is None:
+            self.raw = open(path, 'wb')
+        else:
+            self.raw = open(path, 'r+b')
+            self.raw.truncate(offset)  # drop whatever was written after the checkpoint
+            self.raw.seek(offset)
+        self._open_member()
+
+    def _open_member(self):
+        self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb') if self.compress else self.raw
+
+    def write(self, text):
+        self.stream.write(text.encode('utf-8'))
+
+    def checkpoint(self):
+        """Make everything written so far durable; returns the file offset."""
+        if self.compress:
+            self.stream.close()  # ends the gzip member; the raw file stays open
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        offset = self.raw.tell()
+        if self.compress:
+            self._open_member()
+        return offset
+
+    def close(self):
+        if self.compress:
+            self.stream.close()
+        self.raw.close()
+
+
+class Command(BaseCommand):
+    help = 'Export chat logs, assessments and appointments as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('collections', nargs='*', help=f'any of {", ".join(EXPORTS)} (default: all)')
+        parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output-dir', default='.')
+        parser.add_argument('--since', help='first day to include (YYYY-MM-DD, UTC)')
+        parser.add_argument('--until', help='first day to exclude (YYYY-MM-DD, UTC)')
+        parser.add_argument('--user', type=int, action='append', help='only these user ids (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint-every', type=int, default=50000)
+        parser.add_argument('--resume', action='store_true', help='continue from the last checkpoint')
+
+    def handle(self, *args, **options):
+        unknown = set(options['collections']) - set(EXPORTS)
+        if unknown:
+            raise CommandError(f'Unknown collection(s): {", ".join(sorted(unknown))}')
+        os.makedirs(options['output_dir'], exist_ok=True)
+        for name in options['collections'] or list(EXPORTS):
+            self._export(name, options)
+
+    def _query(self, name, options):
+        _, date_field, user_fields = EXPORTS[name]
+        query = {}
+        if options['since'] or options['until']:
+            query[date_field] = {}
+            if options['since']:
+                query[date_field]['$gte'] = _day(options['since'])
+            if options['until']:
+                query[date_field]['$lt'] = _day(options['until'])
+        if options['user']:
+            users = {'$in': options['user']}
+            if len(user_fields) == 1:
+                query[user_fields[0]] = users
+            else:
+                query['$or'] = [{field: users} for field in user_fields]
+        return query
+
+    def _export(self, name, options):
+        model = EXPORTS[name][0]
+        ext = options['format'] + ('.gz' if options['gzip'] else '')
+        path = os.path.join(options['output_dir'], f'{name}.{ext}')
+        checkpoint_path = path + '.checkpoint.json'
+        query = self._query(name, options)
+        signature = json.dumps(query, default=_plain, sort_keys=True)
+
+        state = {'last_id': None, 'offset': None, 'exported': 0, 'done': False, 'query': signature}
+        if options['resume'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = json.load(f)
+            if state['query'] != signature:
+                raise CommandError(f'{checkpoint_path} was written with different filters; drop --resume.')
+            if state['done']:
+                self.stdout.write(f'{name}: already complete ({state["exported"]} documents)')
+                return
+        elif os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)  # a fresh export invalidates the old checkpoint
+
+        columns = _columns(model)
+        out = _Output(path, options['gzip'], state['offset'])
+        if state['offset'] is None and options['format'] == 'csv':
+            out.write(_csv_rows([columns]))
+
+        def save_checkpoint(done=False):
+            state.update(offset=out.checkpoint(), done=done)
+            tmp = checkpoint_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, checkpoint_path)
+
+        collection = model._get_collection().with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+        since_checkpoint = 0
+        batch = []
+        try:
+            while True:
+                page_query = dict(query)
+                if state['last_id']:
+                    page_query['_id'] = {'$gt': ObjectId(state['last_id'])}
+                cursor = collection.find(page_query).sort('_id', 1).batch_size(options['batch_size'])
+                try:
+                    for doc in cursor:
+                        batch.append(doc)
+                        if len(batch) >= options['batch_size']:
+                            since_checkpoint += self._write(out, batch, columns, options['format'], state)
+                            if since_checkpoint >= options['checkpoint_every']:
+                                save_checkpoint()
+                                since_checkpoint = 0
+                                self.stdout.write(f'{name}: {state["exported"]} exported')
+                    break
+                except CursorNotFound:
+                    # The server reaped the cursor (slow consumer); reopen after the last written _id
+                    since_checkpoint += self._write(out, batch, columns, options['format'], state)
+            self._write(out, batch, columns, options['format'], state)
+            save_checkpoint(done=True)
+        finally:
+            out.close()
+        self.stdout.write(self.style.SUCCESS(f'{name}: {state["exported"]} documents -> {path}'))
+
+    def _write(self, out, batch, columns, fmt, state):
+        """Write and clear `batch`; returns how many documents were written."""
+        if not batch:
+            return 0
+        if fmt == 'ndjson':
+            out.write(''.join(json.dumps(doc, default=_plain, ensure_ascii=False) + '\n' for doc in batch))
+        else:
+            out.write(_csv_rows(
+                [_plain(v) if isinstance(v, (ObjectId, datetime)) else v for v in (doc.get(c) for c in columns)]
+                for doc in batch
+            ))
+        written = len(batch)
+        state['last_id'] = str(batch[-1]['_id'])
+        state['exported'] += written
+        batch.clear()
+        return written
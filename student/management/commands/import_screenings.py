@@ -0,0 +1,34 @@
+"""
+Score a CSV of offline PHQ-9/GAD-7 screening forms in bulk.
+Usage: python manage.py import_screenings forms.csv [--batch-size 1000] [--dry-run]
+Columns: user_id or email, q1..q9, g1..g7 (0-3 each), optional taken_at.
+See student/screenings.py; rows with errors are reported and skipped.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from student import screenings
+
+
+class Command(BaseCommand):
+    help = 'Score PHQ-9/GAD-7 forms from a CSV file and update student risk levels.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Score and validate but do not write.')
+
+    def handle(self, *args, **options):
+        try:
+            f = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with f:
+            result = screenings.import_csv(f, options['batch_size'], options['dry_run'])
+        for line, message in result['errors']:
+            self.stderr.write(f'line {line}: {message}')
+        levels = ', '.join(f'{level}: {n}' for level, n in sorted(result['levels'].items()))
+        verb = 'would import' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['imported']} forms {verb} ({levels or 'none'}), {len(result['errors'])} skipped, "
+            f"{result['changed']} student risk levels changed."
+        ))
@@ -0,0 +1,55 @@
+"""
+Convert legacy Appointment.date strings into typed starts_at / duration_minutes.
+Usage: python manage.py migrate_appointment_dates [--batch-size 1000] [--dry-run]
+Walks appointments without starts_at in _id order and writes each batch with one
+bulk_write. Safe to re-run; unparseable dates are reported and left as they are.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from student.models import Appointment
+from student.slots import default_duration, parse_start
+
+
+def _parse_legacy(value):
+    """Accept 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM' and 'YYYY-MM-DDTHH:MM'."""
+    value = (value or '').strip().replace('T', ' ')
+    day, _, at = value.partition(' ')
+    return parse_start(day, at[:5])
+
+
+class Command(BaseCommand):
+    help = 'Convert legacy string appointment dates into starts_at datetimes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        collection = Appointment._get_collection()
+        query = {'starts_at': {'$exists': False}}
+        converted = skipped = 0
+        last_id = None
+        while True:
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            batch = list(collection.find(query, {'date': 1}).sort('_id', 1).limit(options['batch_size']))
+            if not batch:
+                break
+            last_id = batch[-1]['_id']
+            ops = []
+            for doc in batch:
+                starts_at = _parse_legacy(doc.get('date'))
+                if starts_at is None:
+                    skipped += 1
+                    self.stderr.write(f"Skipping {doc['_id']}: unparseable date {doc.get('date')!r}")
+                    continue
+                ops.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'starts_at': starts_at, 'duration_minutes': default_duration()}},
+                ))
+            if ops and not options['dry_run']:
+                collection.bulk_write(ops, ordered=False)
+            converted += len(ops)
+            self.stdout.write(f'{converted} converted, {skipped} skipped')
+        self.stdout.write(self.style.SUCCESS(f'Done: {converted} converted, {skipped} skipped.'))
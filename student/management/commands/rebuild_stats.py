@@ -0,0 +1,18 @@
+"""
+Recompute the materialized admin statistics (student.stats) from raw MongoDB data.
+Usage: python manage.py rebuild_stats
+"""
+from django.core.management.base import BaseCommand
+
+from student.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin statistics counter document from raw MongoDB data.'
+
+    def handle(self, *args, **options):
+        stats = rebuild_stats()
+        self.stdout.write(f"High-risk users: {stats['high_risk_users']}")
+        self.stdout.write(f"Appointments by status: {stats['appointments_by_status']}")
+        self.stdout.write(f"Assessments by level: {stats['assessments_by_level']}")
+        self.stdout.write(self.style.SUCCESS('Stats rebuilt.'))
@@ -0,0 +1,40 @@
+"""
+Fold finished days of chat logs into chat_daily, then apply the retention TTL.
+Usage: python manage.py rollup_chats [--since YYYY-MM-DD]
+Run daily (cron). --since recomputes from that day (never before the oldest fully
+retained day). See student/retention.py.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from student import retention
+
+
+class Command(BaseCommand):
+    help = 'Roll chat logs up into daily counts and expire raw logs after CHAT_RETENTION_DAYS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='recompute from this day (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM-DD.')
+        start, end, gap = retention.rollup(since)
+        if gap:
+            self.stderr.write(self.style.WARNING(
+                f'Logs before {start.date()} expired before they were rolled up; those days are missing.'))
+        if start < end:
+            self.stdout.write(f'Rolled up {start.date()} .. {end.date()} (exclusive).')
+        else:
+            self.stdout.write('Nothing to roll up.')
+        seconds = retention.ensure_ttl_index()
+        if seconds:
+            self.stdout.write(self.style.SUCCESS(f'Chat logs expire after {settings.CHAT_RETENTION_DAYS} days.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Chat log expiry is off (CHAT_RETENTION_DAYS=0).'))
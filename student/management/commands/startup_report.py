@@ -0,0 +1,63 @@
+"""
+Startup report: how long `django.setup()` takes, which imports dominate it,
+and whether MongoDB is reachable.
+Usage: python manage.py startup_report [--top 15] [--require-mongo]
+Imports are timed in a fresh interpreter with `python -X importtime`.
+"""
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wellness_connect.mongo import health_check
+
+_SETUP = 'import django; django.setup()'
+
+
+def _import_times(top):
+    """Run django.setup() in a child interpreter; return (wall seconds, [(cumulative_us, module)])."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'wellness_connect.settings'))
+    started = time.monotonic()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SETUP],
+        capture_output=True, text=True, env=env, cwd=os.getcwd(),
+    )
+    wall = time.monotonic() - started
+    if proc.returncode != 0:
+        raise CommandError(f'django.setup() failed in a child process:\n{proc.stderr[-2000:]}')
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        if not name.startswith('  '):  # top-level imports only; nested ones are inside them
+            rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return wall, rows[:top]
+
+
+class Command(BaseCommand):
+    help = 'Report django.setup() import costs and MongoDB health.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='How many top-level imports to list.')
+        parser.add_argument('--require-mongo', action='store_true', help='Exit with an error if MongoDB is down.')
+
+    def handle(self, *args, **options):
+        wall, rows = _import_times(options['top'])
+        self.stdout.write(f'django.setup() in a fresh interpreter: {wall * 1000:.0f} ms (including startup)')
+        self.stdout.write(f"{'cumulative ms':>14}  module")
+        for cumulative, name in rows:
+            self.stdout.write(f'{cumulative / 1000:>14.1f}  {name}')
+
+        health = health_check()
+        if health['ok']:
+            self.stdout.write(self.style.SUCCESS(f"MongoDB: ok ({health['latency_ms']} ms)"))
+        else:
+            message = f"MongoDB: unreachable after {health['latency_ms']} ms ({health['error']})"
+            if options['require_mongo']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,60 @@
+"""
+Remove MongoDB documents whose user no longer exists.
+Usage: python manage.py sweep_orphans [--chunk-size 1000] [--dry-run] [--skip-jobs]
+First runs any queued or abandoned cascade jobs (student/cascade.py), then walks
+the distinct user_id / student_id / counsellor_id values of every collection in
+chunks, checks each chunk against live User ids with one SQL query, and removes
+every document of the ids that are gone (in batches, like a cascade job).
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from student import cascade
+
+
+def _distinct_ids(model, field, chunk_size):
+    """Yield lists of distinct values of `field`, in ascending order, chunk_size at a time."""
+    cursor = model._get_collection().aggregate(
+        [{'$group': {'_id': f'${field}'}}, {'$sort': {'_id': 1}}],
+        allowDiskUse=True, batchSize=chunk_size,
+    )
+    chunk = []
+    for row in cursor:
+        if isinstance(row['_id'], int):
+            chunk.append(row['_id'])
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Delete MongoDB documents that belong to users who no longer exist.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='only report orphaned user ids')
+        parser.add_argument('--skip-jobs', action='store_true', help='do not run queued cascade jobs first')
+
+    def handle(self, *args, **options):
+        if not options['skip_jobs'] and not options['dry_run']:
+            self.stdout.write(f'{cascade.run_pending()} queued cascade job(s) processed')
+
+        orphans = set()
+        for model, field in cascade.TARGETS:
+            found = 0
+            for chunk in _distinct_ids(model, field, options['chunk_size']):
+                live = set(User.objects.filter(id__in=chunk).values_list('id', flat=True))
+                missing = set(chunk) - live
+                found += len(missing)
+                orphans |= missing
+            self.stdout.write(f'{model._get_collection_name()}.{field}: {found} orphaned user id(s)')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {len(orphans)} orphaned user id(s), nothing deleted.'))
+            return
+        removed = 0
+        for user_id in sorted(orphans):
+            removed += sum(cascade.delete_user_documents(user_id).values())
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} document(s) of {len(orphans)} deleted user(s).'))
@@ -0,0 +1,60 @@
+"""
+Train the bag-of-words chat classifier from labelled messages.
+Usage: python manage.py train_stress_model labelled.csv --output stress_model.json
+           [--min-count 2] [--alpha 1.0]
+The CSV has the columns text and level (Low, Medium or High). The model is a
+multinomial naive Bayes, i.e. log-probabilities per token and label, saved in the
+BagOfWordsModel format; point settings.STRESS_MODEL_PATH at the output file.
+"""
+import csv
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from student.classification_service import TOKEN, BagOfWordsModel
+from student.classifier import DEFAULT_LEVEL, LEVELS
+
+LABELS = [DEFAULT_LEVEL, *reversed(LEVELS)]  # Low, Medium, High
+
+
+class Command(BaseCommand):
+    help = 'Train a bag-of-words stress model from a CSV of labelled messages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--output', required=True)
+        parser.add_argument('--min-count', type=int, default=2, help='ignore tokens seen fewer times')
+        parser.add_argument('--alpha', type=float, default=1.0, help='additive smoothing')
+
+    def handle(self, *args, **options):
+        docs = []
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                for row in csv.DictReader(f):
+                    level = (row.get('level') or '').strip().capitalize()
+                    if level in LABELS:
+                        docs.append((TOKEN.findall((row.get('text') or '').lower()), LABELS.index(level)))
+        except OSError as exc:
+            raise CommandError(str(exc))
+        if not docs:
+            raise CommandError('No rows with text and a Low/Medium/High level.')
+
+        totals = Counter(token for tokens, _ in docs for token in tokens)
+        vocabulary = sorted(t for t, n in totals.items() if n >= options['min_count'])
+        index = {t: i for i, t in enumerate(vocabulary)}
+        counts = np.zeros((len(vocabulary), len(LABELS)))
+        per_label = np.zeros(len(LABELS))
+        for tokens, label in docs:
+            per_label[label] += 1
+            for token in tokens:
+                if token in index:
+                    counts[index[token], label] += 1
+
+        smoothed = counts + options['alpha']
+        weights = np.log(smoothed / smoothed.sum(axis=0))
+        bias = np.log((per_label + 1) / (per_label.sum() + len(LABELS)))
+        BagOfWordsModel(LABELS, vocabulary, weights, bias).save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(docs)} messages, {len(vocabulary)} tokens -> {options["output"]} '
+            f'({", ".join(f"{l}: {int(n)}" for l, n in zip(LABELS, per_label))})'))
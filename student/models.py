@@ -1,8 +1,14 @@
 """
 MongoEngine models stored in MongoDB: ChatLog, Assessment, Appointment.
 user_id / student_id / counsellor_id refer to Django User id (integer).
+StatsCounter / HighRiskUser hold the admin statistics kept by student/stats.py.
+RiskState is the rolling per-student risk state kept by accounts/risk_engine.py.
+CascadeJob queues the removal of a deleted user's documents (student/cascade.py).
+ChatDaily holds per-day chat counts rolled up by student/retention.py, so history
+outlives the CHAT_RETENTION_DAYS expiry of raw ChatLogs.
+StressTrend holds per-day and per-week stress buckets kept by student/trends.py.
 """
-from mongoengine import Document, IntField, StringField, DateTimeField, FloatField
+from mongoengine import Document, IntField, StringField, DateTimeField, FloatField, DictField
 from datetime import datetime
 
 
@@ -13,7 +19,31 @@ class ChatLog(Document):
     stress_level = StringField(required=True)  # 'Low', 'Medium', 'High'
     timestamp = DateTimeField(default=datetime.utcnow)
 
-    meta = {'collection': 'chat_logs'}
+    meta = {
+        'collection': 'chat_logs',
+        'indexes': [
+            ('user_id', '-timestamp', '-id'),  # chat history per student (keyset pages)
+            ('stress_level', 'user_id'),  # High logs for admin stats
+        ],
+    }
+
+
+class ChatDaily(Document):
+    """Chat messages of one user on one (UTC) day, counted by stress level."""
+    user_id = IntField(required=True)
+    day = DateTimeField(required=True)  # midnight UTC
+    low = IntField(default=0)
+    medium = IntField(default=0)
+    high = IntField(default=0)
+    total = IntField(default=0)
+
+    meta = {
+        'collection': 'chat_daily',
+        'indexes': [
+            {'fields': ['user_id', 'day'], 'unique': True},  # roll-up $merge key, per-student history
+            'day',
+        ],
+    }
 
 
 class Assessment(Document):
@@ -28,13 +58,108 @@ class Assessment(Document):
     final_level = StringField(default='')  # 'Low', 'Medium', 'High'
     created_at = DateTimeField(default=datetime.utcnow)
 
-    meta = {'collection': 'assessments'}
+    meta = {
+        'collection': 'assessments',
+        'indexes': [
+            ('user_id', '-created_at', '-date'),  # latest assessment per student
+            ('stress_level', 'user_id'),  # High assessments for admin stats
+        ],
+    }
 
 
 class Appointment(Document):
     student_id = IntField(required=True)
     counsellor_id = IntField(required=True)
-    date = StringField(required=True)  # e.g. "2024-02-20"
+    date = StringField(required=True)  # day, e.g. "2024-02-20"; legacy, use starts_at
     status = StringField(required=True, default='Pending')  # Pending, Approved, Completed
+    # Typed schedule (see student/slots.py); old docs: manage.py migrate_appointment_dates
+    starts_at = DateTimeField()
+    duration_minutes = IntField(default=50)
+
+    meta = {
+        'collection': 'appointments',
+        'indexes': [
+            ('counsellor_id', 'starts_at'),  # dashboard, calendar range queries, conflicts
+            'student_id',
+        ],
+    }
+
+
+class StatsCounter(Document):
+    """Materialized admin statistics; a single document with id 'global'."""
+    id = StringField(primary_key=True)
+    high_risk_users = IntField(default=0)
+    appointments_by_status = DictField()  # e.g. {'Pending': 3, 'Approved': 1}
+    assessments_by_level = DictField()  # e.g. {'Low': 10, 'High': 2}
+    rebuilt_at = DateTimeField()
+
+    meta = {'collection': 'stats'}
+
+
+class HighRiskUser(Document):
+    """One marker per user ever seen at High; lets stats count distinct users in O(1)."""
+    user_id = IntField(primary_key=True)
+    first_seen = DateTimeField(default=datetime.utcnow)
+
+    meta = {'collection': 'stats_high_risk_users'}
+
+
+class RiskState(Document):
+    """
+    Rolling risk state per student, updated in O(1) per event by the risk engine:
+    time-decayed counts of chat levels, last PHQ/GAD with timestamps, and the
+    highest event score seen in the current peak window.
+    """
+    user_id = IntField(primary_key=True)
+    chat_low = FloatField(default=0.0)
+    chat_medium = FloatField(default=0.0)
+    chat_high = FloatField(default=0.0)
+    last_phq = IntField()
+    last_phq_at = DateTimeField()
+    last_gad = IntField()
+    last_gad_at = DateTimeField()
+    peak_score = IntField(default=0)
+    peak_at = DateTimeField()
+    updated_at = DateTimeField()
+
+    meta = {'collection': 'risk_states'}
+
+
+class CascadeJob(Document):
+    """Removal of a deleted user's MongoDB documents, processed in the background."""
+    user_id = IntField(required=True)
+    status = StringField(default='pending')  # pending, running, done, failed
+    created_at = DateTimeField(default=datetime.utcnow)
+    started_at = DateTimeField()
+    finished_at = DateTimeField()
+    lease = StringField()  # token of the worker running it; checked before every batch
+    heartbeat_at = DateTimeField()  # refreshed before every batch
+    attempts = IntField(default=0)  # failed runs so far
+    retry_at = DateTimeField()  # a failed job is pending again from then
+    deleted = DictField()  # collection/field -> documents removed
+    error = StringField(default='')
+
+    meta = {
+        'collection': 'cascade_jobs',
+        'indexes': [('status', 'created_at')],
+    }
+
+
+class StressTrend(Document):
+    """One user's chats by stress level and highest PHQ/GAD in one day or week (UTC)."""
+    user_id = IntField(required=True)
+    period = StringField(required=True)  # 'day' or 'week'
+    start = DateTimeField(required=True)  # midnight UTC; weeks start on Monday
+    low = IntField(default=0)
+    medium = IntField(default=0)
+    high = IntField(default=0)
+    assessments = IntField(default=0)
+    max_phq = IntField()
+    max_gad = IntField()
 
-    meta = {'collection': 'appointments'}
+    meta = {
+        'collection': 'stress_trends',
+        'indexes': [
+            {'fields': ['user_id', 'period', 'start'], 'unique': True},  # upsert key, sparkline reads
+        ],
+    }
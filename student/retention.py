@@ -0,0 +1,96 @@
+"""
+Chat log retention: daily roll-ups into ChatDaily, then TTL expiry of raw logs.
+rollup() folds every finished UTC day since the last roll-up into chat_daily
+(one document per user and day, counts by stress level) with one $group/$merge
+aggregation, replacing the days it recomputes, so re-running it is harmless.
+ensure_ttl_index() then makes raw ChatLogs expire after CHAT_RETENTION_DAYS.
+Once the TTL index exists, days whose logs may be partly expired are never
+recomputed. Run both
+daily (manage.py rollup_chats); a day not rolled up before it expires is lost.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from .models import ChatDaily, ChatLog
+
+TTL_INDEX = 'timestamp_ttl'
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _midnight(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def oldest_complete_day(now=None):
+    """First day whose raw logs are all still there, or None while nothing has expired."""
+    days = settings.CHAT_RETENTION_DAYS
+    if not days or TTL_INDEX not in ChatLog._get_collection().index_information():
+        return None
+    return _midnight(now or datetime.utcnow()) - timedelta(days=days - 1)
+
+
+def day_of(field):
+    """Aggregation expression for midnight UTC of a date field: the date minus its ms since midnight."""
+    return {'$subtract': [field, {'$mod': [{'$subtract': [field, _EPOCH]}, 86400000]}]}
+
+
+def rollup_range(start, end):
+    """Recompute chat_daily for the days in [start, end) from the raw logs."""
+    day = day_of('$timestamp')
+
+    def count(level):
+        return {'$sum': {'$cond': [{'$eq': ['$stress_level', level]}, 1, 0]}}
+
+    ChatDaily.ensure_indexes()  # $merge needs the unique (user_id, day) index
+    ChatLog._get_collection().aggregate([
+        {'$match': {'timestamp': {'$gte': start, '$lt': end}}},
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'day': day},
+            'low': count('Low'), 'medium': count('Medium'), 'high': count('High'), 'total': {'$sum': 1},
+        }},
+        {'$project': {'_id': 0, 'user_id': '$_id.user_id', 'day': '$_id.day',
+                      'low': 1, 'medium': 1, 'high': 1, 'total': 1}},
+        {'$merge': {'into': ChatDaily._get_collection_name(), 'on': ['user_id', 'day'],
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}},
+    ], allowDiskUse=True)
+
+
+def rollup(since=None, now=None):
+    """
+    Roll up every finished day from `since` (default: the last rolled-up day, or
+    the first logged day) until yesterday. Returns (start, end, gap): gap is True
+    when days between the last roll-up and the retained logs were never rolled up.
+    """
+    end = _midnight(now or datetime.utcnow())
+    last = ChatDaily.objects.order_by('-day').only('day').first()
+    if since is None:
+        if last:
+            since = last.day  # recomputed: it may have been rolled up mid-day by hand
+        else:
+            first = ChatLog.objects.order_by('timestamp').only('timestamp').first()
+            since = first.timestamp if first else end
+    start = _midnight(since)
+    oldest = oldest_complete_day(now)
+    gap = bool(oldest and start < oldest and last)
+    if oldest and start < oldest:
+        start = oldest
+    if start < end:
+        rollup_range(start, end)
+    return start, end, gap
+
+
+def ensure_ttl_index():
+    """Create, update (collMod) or drop the TTL index to match CHAT_RETENTION_DAYS."""
+    collection = ChatLog._get_collection()
+    existing = collection.index_information().get(TTL_INDEX)
+    seconds = settings.CHAT_RETENTION_DAYS * 86400
+    if not seconds:
+        if existing:
+            collection.drop_index(TTL_INDEX)
+        return None
+    if existing is None:
+        collection.create_index([('timestamp', 1)], name=TTL_INDEX, expireAfterSeconds=seconds)
+    elif existing.get('expireAfterSeconds') != seconds:
+        collection.database.command('collMod', collection.name, index={'name': TTL_INDEX, 'expireAfterSeconds': seconds})
+    return seconds
@@ -0,0 +1,141 @@
+"""
+Load-aware counsellor assignment for bookings.
+Keeps, per date and counsellor, the number of active (Pending/Approved)
+appointments in memory, with one min-heap per date so the least-loaded
+counsellor is found in O(log n). Loads are rebuilt from MongoDB on first use
+and every COUNSELLOR_LOAD_REFRESH_SECONDS (other worker processes book too),
+and updated in between by the booking and appointment-status views.
+"""
+import heapq
+import threading
+import time
+from datetime import date as date_cls
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from accounts.models import User
+
+from .models import Appointment
+
+ACTIVE_STATUSES = ('Pending', 'Approved')
+
+
+class CounsellorScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counsellors = None  # set of counsellor ids; None until rebuilt
+        self._loads = {}  # (date, counsellor_id) -> active appointment count
+        self._heaps = {}  # date -> heap of (load, counsellor_id); stale entries skipped lazily
+        self._built_at = 0.0
+
+    def rebuild(self):
+        """Reload counsellors (SQL) and active appointment counts from today on (Mongo)."""
+        counsellors = set(User.objects.filter(role='Counsellor', is_active=True).values_list('id', flat=True))
+        pipeline = [
+            {'$match': {'status': {'$in': list(ACTIVE_STATUSES)}, 'date': {'$gte': date_cls.today().isoformat()}}},
+            {'$group': {'_id': {'date': '$date', 'counsellor_id': '$counsellor_id'}, 'n': {'$sum': 1}}},
+        ]
+        loads = {
+            (row['_id']['date'], row['_id']['counsellor_id']): row['n']
+            for row in Appointment.objects.aggregate(pipeline)
+        }
+        with self._lock:
+            self._counsellors = counsellors
+            self._loads = loads
+            self._heaps = {}
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        refresh = getattr(settings, 'COUNSELLOR_LOAD_REFRESH_SECONDS', 300)
+        if self._counsellors is None or time.monotonic() - self._built_at > refresh:
+            self.rebuild()
+
+    def _heap(self, date):
+        heap = self._heaps.get(date)
+        if heap is None or len(heap) > 4 * len(self._counsellors) + 16:
+            heap = [(self._loads.get((date, c), 0), c) for c in self._counsellors]
+            heapq.heapify(heap)
+            self._heaps[date] = heap
+        return heap
+
+    def counsellor_ids(self):
+        """Ids of the active counsellors."""
+        self._ensure_built()
+        with self._lock:
+            return set(self._counsellors)
+
+    def pick(self, date, exclude=()):
+        """
+        Id of the least-loaded counsellor on `date` (ties go to the lowest id) who
+        is not in `exclude`, or None.
+        """
+        self._ensure_built()
+        with self._lock:
+            heap = self._heap(date)
+            skipped = []
+            picked = None
+            while heap:
+                load, counsellor_id = heap[0]
+                if counsellor_id not in self._counsellors or load != self._loads.get((date, counsellor_id), 0):
+                    heapq.heappop(heap)  # stale entry
+                elif counsellor_id in exclude:
+                    skipped.append(heapq.heappop(heap))
+                else:
+                    picked = counsellor_id
+                    break
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            return picked
+
+    def _adjust(self, date, counsellor_id, delta):
+        with self._lock:
+            key = (date, counsellor_id)
+            self._loads[key] = max(0, self._loads.get(key, 0) + delta)
+            if date in self._heaps:
+                heapq.heappush(self._heaps[date], (self._loads[key], counsellor_id))
+
+    def record_booking(self, date, counsellor_id):
+        """Call after creating a Pending appointment."""
+        self._adjust(date, counsellor_id, 1)
+
+    def record_status_change(self, date, counsellor_id, old_status, new_status):
+        """Call after an appointment's status changes."""
+        delta = (new_status in ACTIVE_STATUSES) - (old_status in ACTIVE_STATUSES)
+        if delta:
+            self._adjust(date, counsellor_id, delta)
+
+    def add_counsellor(self, counsellor_id):
+        with self._lock:
+            if self._counsellors is None or counsellor_id in self._counsellors:
+                return
+            self._counsellors.add(counsellor_id)
+            for date, heap in self._heaps.items():
+                heapq.heappush(heap, (self._loads.get((date, counsellor_id), 0), counsellor_id))
+
+    def remove_counsellor(self, counsellor_id):
+        with self._lock:
+            if self._counsellors is not None:
+                self._counsellors.discard(counsellor_id)
+
+
+scheduler = CounsellorScheduler()
+
+
+def _user_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'role', 'is_active'} & set(update_fields):
+        return  # e.g. risk-field saves from the risk engine
+    if instance.role == 'Counsellor' and instance.is_active:
+        scheduler.add_counsellor(instance.id)
+    else:
+        scheduler.remove_counsellor(instance.id)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    scheduler.remove_counsellor(instance.id)
+
+
+def connect_signals():
+    """Keep the counsellor set current as users are created, changed or deleted."""
+    post_save.connect(_user_saved, sender=User, dispatch_uid='scheduler_user_saved')
+    post_delete.connect(_user_deleted, sender=User, dispatch_uid='scheduler_user_deleted')
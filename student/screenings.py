@@ -0,0 +1,199 @@
+"""
+Bulk scoring of PHQ-9/GAD-7 screening forms collected offline.
+A CSV has one form per row: the student (column user_id or email), the item
+responses q1..q9 (PHQ-9) and g1..g7 (GAD-7), each 0-3, and optionally taken_at
+(ISO date/time, UTC; default now). Used by `manage.py import_screenings` and the
+admin upload page.
+Each batch of rows is scored at once with NumPy (risk_engine.final_level_scores,
+the same rules as determine_final_level), inserted with one insert_many, folded
+into the students' RiskStates with one bulk_write, and the changed User risk
+fields are written with one bulk_update, instead of a save per form.
+Forms are folded in as of taken_at (risk_engine.assessment_state_update): an old
+form only counts for what is left of its validity window, and never replaces a
+newer assessment already on record.
+"""
+import csv
+import io
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from pymongo import UpdateOne
+
+from accounts import risk_writes
+from accounts.alerts import publish_level_change
+from accounts.models import User
+from accounts.risk_engine import (
+    ASSESSMENT_VALID_DAYS, assessment_state_update, final_level_scores, level_for_score, level_from_state,
+)
+from wellness_connect.fragments import bump
+
+from . import stats, trends
+from .models import Assessment, RiskState
+
+PHQ_ITEMS = [f'q{i}' for i in range(1, 10)]
+GAD_ITEMS = [f'g{i}' for i in range(1, 8)]
+_SCORE = {'Low': 1, 'Medium': 2, 'High': 3}
+
+
+def _parse_taken_at(value, now):
+    if not value:
+        return now
+    taken_at = datetime.fromisoformat(value)
+    if taken_at.tzinfo is not None:
+        taken_at = taken_at.replace(tzinfo=None) - taken_at.utcoffset()  # naive UTC, like the other timestamps
+    return taken_at
+
+
+def _parse_rows(rows, now):
+    """Split raw CSV rows into (forms, errors); a form is (line, key, items, taken_at)."""
+    forms, errors = [], []
+    for line, row in rows:
+        key = (row.get('user_id') or '').strip() or (row.get('email') or '').strip().lower()
+        if not key:
+            errors.append((line, 'no user_id or email'))
+            continue
+        try:
+            items = [int(row[c]) for c in PHQ_ITEMS + GAD_ITEMS]
+            taken_at = _parse_taken_at((row.get('taken_at') or '').strip(), now)
+        except (KeyError, TypeError, ValueError) as exc:
+            errors.append((line, f'bad value: {exc}'))
+            continue
+        if taken_at > now:
+            errors.append((line, 'taken_at is in the future'))
+            continue
+        forms.append((line, key, items, taken_at))
+    return forms, errors
+
+
+def _students(keys):
+    """Map each user_id / lowercased email key to its student User (only the risk fields are loaded)."""
+    ids = [int(k) for k in keys if k.isdigit()]
+    emails = [k for k in keys if not k.isdigit()]
+    qs = User.objects.filter(role='Student').only('id', 'email', 'name', *risk_writes.RISK_FIELDS)
+    found = {}
+    if ids:
+        found.update({str(u.id): u for u in qs.filter(id__in=ids)})
+    if emails:
+        # Stored addresses may have mixed-case local parts; compare case-insensitively in one query
+        found.update({u.email.lower(): u for u in qs.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)})
+    return found
+
+
+def score_batch(rows, now=None, dry_run=False):
+    """
+    Score and store one batch of (line number, CSV dict) rows.
+    Returns {'imported': n, 'levels': Counter, 'errors': [(line, message)], 'changed': n}.
+    """
+    import numpy as np
+
+    now = now or datetime.utcnow()
+    forms, errors = _parse_rows(rows, now)
+    students = _students({key for _, key, _, _ in forms})
+    valid = []
+    for form in forms:
+        if form[1] not in students:
+            errors.append((form[0], f'no student {form[1]!r}'))
+        else:
+            valid.append(form)
+    result = {'imported': 0, 'levels': Counter(), 'errors': errors, 'changed': 0}
+    if not valid:
+        return result
+
+    items = np.array([form[2] for form in valid], dtype=np.int64)
+    in_range = ((items >= 0) & (items <= 3)).all(axis=1)
+    for form, ok in zip(valid, in_range.tolist()):
+        if not ok:
+            errors.append((form[0], 'item responses must be 0-3'))
+    valid = [form for form, ok in zip(valid, in_range.tolist()) if ok]
+    items = items[in_range]
+    if not valid:
+        return result
+    phq = items[:, :len(PHQ_ITEMS)].sum(axis=1)
+    gad = items[:, len(PHQ_ITEMS):].sum(axis=1)
+    levels = [level_for_score(s) for s in final_level_scores([None] * len(valid), phq.tolist(), gad.tolist())]
+    result['imported'] = len(valid)
+    result['levels'] = Counter(levels)
+    if dry_run:
+        return result
+
+    docs, updates, affected = [], [], {}
+    valid_since = now - timedelta(days=ASSESSMENT_VALID_DAYS)
+    scored = sorted(zip(valid, phq.tolist(), gad.tolist(), levels), key=lambda row: row[0][3])  # by taken_at
+    for (_, key, _, taken_at), p, g, level in scored:
+        user = students[key]
+        docs.append({
+            'user_id': user.id, 'total_score': p + g, 'stress_level': level, 'date': taken_at,
+            'phq_score': p, 'gad_score': g, 'chat_stress_level': '', 'final_level': level, 'created_at': taken_at,
+        })
+        if taken_at >= valid_since:  # older forms are history only, like expired assessments
+            updates.append(UpdateOne({'_id': user.id}, assessment_state_update(p, g, taken_at), upsert=True))
+            affected[user.id] = user
+    Assessment._get_collection().insert_many(docs, ordered=False)
+    if updates:
+        RiskState._get_collection().bulk_write(updates, ordered=True)  # oldest first
+    stats.record_assessments([(d['user_id'], d['stress_level']) for d in docs])
+    trends.record_assessments([(d['user_id'], d['phq_score'], d['gad_score'], d['created_at']) for d in docs])
+
+    result['changed'] = _update_users(affected.values(), now)
+    bump('assessments')
+    return result
+
+
+def _update_users(users, now):
+    """Recompute the users' levels from their RiskStates; bulk_update the ones that changed."""
+    by_id = {u.id: u for u in users}
+    if not by_id:
+        return 0
+    states = RiskState._get_collection().find({'_id': {'$in': list(by_id)}})
+    changed = []
+    for state in states:
+        user = by_id[state['_id']]
+        level = level_from_state(state, now)
+        values = (_SCORE[level], level, level == 'High')
+        previous = (risk_writes.buffer.pending(user.id) or (None, user.current_stress_level))[1]
+        risk_writes.buffer.discard(user.id)  # superseded by this write
+        if values != (user.risk_score, user.current_stress_level, user.is_flagged_high):
+            user.risk_score, user.current_stress_level, user.is_flagged_high = values
+            changed.append(user)
+        if level != previous:
+            publish_level_change(user, previous, level, _SCORE[level] > _SCORE.get(previous, 0))
+    if changed:
+        with transaction.atomic():
+            User.objects.bulk_update(changed, risk_writes.RISK_FIELDS, batch_size=500)
+        bump('risk')
+    return len(changed)
+
+
+def import_csv(fileobj, batch_size=1000, dry_run=False):
+    """
+    Score every form in a CSV file (text or binary file object), batch_size rows
+    at a time. Returns the summed result of score_batch.
+    """
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(fileobj)
+    total = {'imported': 0, 'levels': Counter(), 'errors': [], 'changed': 0}
+    batch = []
+
+    def flush():
+        result = score_batch(batch, dry_run=dry_run)
+        for key in ('imported', 'changed'):
+            total[key] += result[key]
+        total['levels'] += result['levels']
+        total['errors'] += result['errors']
+        batch.clear()
+
+    missing = [c for c in PHQ_ITEMS + GAD_ITEMS if c not in (reader.fieldnames or [])]
+    if missing:
+        total['errors'].append((1, f'missing columns: {", ".join(missing)}'))
+        return total
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    total['errors'].sort()
+    return total
@@ -0,0 +1,108 @@
+"""
+Counsellor calendars on top of Appointment.starts_at / duration_minutes.
+Every lookup is one range query on the (counsellor_id, starts_at) index;
+free slots are computed in Python from the appointments that query returns.
+Times are naive UTC, like the other MongoDB timestamps.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+
+from .models import Appointment
+
+ACTIVE_STATUSES = ('Pending', 'Approved')
+# Longest appointment we expect; bounds how far back an overlapping booking can start
+MAX_DURATION_MINUTES = 240
+
+
+def default_duration():
+    return getattr(settings, 'APPOINTMENT_DURATION_MINUTES', 50)
+
+
+def parse_start(day, at=''):
+    """Combine a 'YYYY-MM-DD' day and optional 'HH:MM' time into a datetime, or None."""
+    try:
+        start_time = time.fromisoformat(at) if at else time(getattr(settings, 'COUNSELLING_DAY_START', 9))
+        return datetime.combine(datetime.strptime(day, '%Y-%m-%d').date(), start_time)
+    except ValueError:
+        return None
+
+
+def _ends_at(appointment):
+    return appointment.starts_at + timedelta(minutes=appointment.duration_minutes or default_duration())
+
+
+def appointments_between(counsellor_id, start, end, statuses=ACTIVE_STATUSES):
+    """Appointments of a counsellor overlapping [start, end), ordered by start time."""
+    qs = Appointment.objects(
+        counsellor_id=counsellor_id,
+        starts_at__gte=start - timedelta(minutes=MAX_DURATION_MINUTES),
+        starts_at__lt=end,
+    )
+    if statuses:
+        qs = qs.filter(status__in=list(statuses))
+    return [a for a in qs.order_by('starts_at') if _ends_at(a) > start]
+
+
+def has_conflict(counsellor_id, starts_at, duration_minutes=None):
+    """True if the counsellor already has an active appointment overlapping this one."""
+    end = starts_at + timedelta(minutes=duration_minutes or default_duration())
+    return bool(appointments_between(counsellor_id, starts_at, end))
+
+
+def busy_counsellors(counsellor_ids, starts_at, duration_minutes=None):
+    """Ids among counsellor_ids with an active appointment overlapping this one (one indexed query)."""
+    end = starts_at + timedelta(minutes=duration_minutes or default_duration())
+    qs = Appointment.objects(
+        counsellor_id__in=list(counsellor_ids),
+        starts_at__gte=starts_at - timedelta(minutes=MAX_DURATION_MINUTES),
+        starts_at__lt=end,
+        status__in=list(ACTIVE_STATUSES),
+    ).only('counsellor_id', 'starts_at', 'duration_minutes')
+    return {a.counsellor_id for a in qs if _ends_at(a) > starts_at}
+
+
+def free_slots_from(appointments, start, end, duration_minutes=None):
+    """
+    Free slots of `duration_minutes` within working hours in [start, end), given the
+    counsellor's appointments in that range (sorted by start, as returned above).
+    """
+    duration = timedelta(minutes=duration_minutes or default_duration())
+    step = timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_STEP_MINUTES', 60))
+    day_start = getattr(settings, 'COUNSELLING_DAY_START', 9)
+    day_end = getattr(settings, 'COUNSELLING_DAY_END', 17)
+    busy = [(a.starts_at, _ends_at(a)) for a in appointments]
+
+    slots = []
+    i = 0
+    day = start.date()
+    while day < end.date() or (day == end.date() and end.time() > time(0)):
+        slot = max(start, datetime.combine(day, time(day_start)))
+        closing = min(end, datetime.combine(day, time(day_end)))
+        while slot + duration <= closing:
+            slot_end = slot + duration
+            while i < len(busy) and busy[i][1] <= slot:
+                i += 1  # appointments are sorted, so the walk is linear
+            j = i
+            while j < len(busy) and busy[j][0] < slot_end and busy[j][1] <= slot:
+                j += 1
+            if j == len(busy) or busy[j][0] >= slot_end:
+                slots.append(slot)
+            slot += step
+        day += timedelta(days=1)
+    return slots
+
+
+def free_slots(counsellor_id, start, end, duration_minutes=None):
+    """Free slots for a counsellor between start and end (one indexed range query)."""
+    return free_slots_from(appointments_between(counsellor_id, start, end), start, end, duration_minutes)
+
+
+def next_appointments(counsellor_id, n=5, now=None):
+    """The counsellor's next `n` active appointments from now."""
+    now = now or datetime.utcnow()
+    return list(
+        Appointment.objects(counsellor_id=counsellor_id, starts_at__gte=now, status__in=list(ACTIVE_STATUSES))
+        .order_by('starts_at')
+        .limit(n)
+    )
@@ -0,0 +1,179 @@
+"""
+Admin statistics: total high-risk users, appointments by status, assessments by level.
+Views call the record_* helpers as they write, so the admin dashboard reads one
+precomputed StatsCounter document instead of scanning history.
+rebuild_stats() recomputes everything in one $facet aggregation (first use, or
+the `rebuild_stats` management command after a restore or manual data fix).
+"""
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from wellness_connect.fragments import bump
+
+from .models import Appointment, Assessment, ChatDaily, ChatLog, HighRiskUser, StatsCounter
+
+STATS_ID = 'global'
+
+
+def _counters():
+    return StatsCounter._get_collection()
+
+
+def _inc(fields):
+    _counters().update_one({'_id': STATS_ID}, {'$inc': fields}, upsert=True)
+    bump('stats')
+
+
+def mark_high_risk(user_id):
+    """Count user_id as high-risk the first time it is seen at High."""
+    result = HighRiskUser._get_collection().update_one(
+        {'_id': int(user_id)},
+        {'$setOnInsert': {'first_seen': datetime.utcnow()}},
+        upsert=True,
+    )
+    if result.upserted_id is not None:
+        _inc({'high_risk_users': 1})
+
+
+def record_chat(user_id, stress_level):
+    """Call after saving a ChatLog."""
+    if stress_level == 'High':
+        mark_high_risk(user_id)
+
+
+def record_assessment(user_id, level):
+    """Call after saving an Assessment with stress_level `level`."""
+    _inc({f'assessments_by_level.{level}': 1})
+    if level == 'High':
+        mark_high_risk(user_id)
+
+
+def record_assessments(rows):
+    """record_assessment for many [(user_id, level), ...] at once (bulk imports)."""
+    _inc({f'assessments_by_level.{level}': n for level, n in Counter(level for _, level in rows).items()})
+    high = sorted({int(uid) for uid, level in rows if level == 'High'})
+    if high:
+        now = datetime.utcnow()
+        result = HighRiskUser._get_collection().bulk_write(
+            [UpdateOne({'_id': uid}, {'$setOnInsert': {'first_seen': now}}, upsert=True) for uid in high],
+            ordered=False,
+        )
+        if result.upserted_count:
+            _inc({'high_risk_users': result.upserted_count})
+
+
+def record_appointment_status(old_status, new_status):
+    """Call after creating an Appointment (old_status=None) or changing its status."""
+    if old_status == new_status:
+        return
+    fields = {f'appointments_by_status.{new_status}': 1}
+    if old_status:
+        fields[f'appointments_by_status.{old_status}'] = -1
+    _inc(fields)
+
+
+def record_deleted(appointment_statuses=None, assessment_levels=None, high_risk_users=0):
+    """
+    Call after removing documents (student.cascade): takes {status: n} of deleted
+    appointments, {level: n} of deleted assessments and the number of removed
+    HighRiskUser markers.
+    """
+    fields = {f'appointments_by_status.{k}': -n for k, n in (appointment_statuses or {}).items() if n}
+    fields.update({f'assessments_by_level.{k}': -n for k, n in (assessment_levels or {}).items() if n})
+    if high_risk_users:
+        fields['high_risk_users'] = -high_risk_users
+    if fields:
+        _inc(fields)
+
+
+def compute_stats():
+    """
+    Compute all admin statistics from raw data in one aggregation round trip:
+    assessments, High chat logs (raw, plus daily roll-ups of expired ones) and
+    appointments are unioned, then $facet produces the three results side by side.
+    """
+    pipeline = [
+        {'$project': {'_id': 0, 'src': {'$literal': 'assessment'}, 'user_id': 1, 'level': '$stress_level'}},
+        {'$unionWith': {
+            'coll': ChatLog._get_collection_name(),
+            'pipeline': [
+                {'$match': {'stress_level': 'High'}},
+                {'$project': {'_id': 0, 'src': {'$literal': 'chat'}, 'user_id': 1, 'level': '$stress_level'}},
+            ],
+        }},
+        {'$unionWith': {
+            'coll': ChatDaily._get_collection_name(),
+            'pipeline': [
+                {'$match': {'high': {'$gt': 0}}},
+                {'$project': {'_id': 0, 'src': {'$literal': 'chat'}, 'user_id': 1, 'level': {'$literal': 'High'}}},
+            ],
+        }},
+        {'$unionWith': {
+            'coll': Appointment._get_collection_name(),
+            'pipeline': [
+                {'$project': {'_id': 0, 'src': {'$literal': 'appointment'}, 'level': '$status'}},
+            ],
+        }},
+        {'$facet': {
+            'high_risk_users': [
+                {'$match': {'src': {'$in': ['assessment', 'chat']}, 'level': 'High'}},
+                {'$group': {'_id': '$user_id'}},
+                {'$count': 'n'},
+            ],
+            'appointments_by_status': [
+                {'$match': {'src': 'appointment'}},
+                {'$group': {'_id': '$level', 'n': {'$sum': 1}}},
+            ],
+            'assessments_by_level': [
+                {'$match': {'src': 'assessment'}},
+                {'$group': {'_id': '$level', 'n': {'$sum': 1}}},
+            ],
+        }},
+    ]
+    result = next(Assessment.objects.aggregate(pipeline, allowDiskUse=True), {})
+    high = result.get('high_risk_users') or [{}]
+    return {
+        'high_risk_users': high[0].get('n', 0),
+        'appointments_by_status': {r['_id']: r['n'] for r in result.get('appointments_by_status', []) if r['_id']},
+        'assessments_by_level': {r['_id']: r['n'] for r in result.get('assessments_by_level', []) if r['_id']},
+    }
+
+
+def _rebuild_high_risk_markers():
+    """Recreate HighRiskUser markers server-side so later increments stay distinct."""
+    markers = HighRiskUser._get_collection_name()
+    merge = {'$merge': {'into': markers, 'on': '_id', 'whenMatched': 'keepExisting', 'whenNotMatched': 'insert'}}
+    high = {'stress_level': 'High'}
+    for model, match in ((Assessment, high), (ChatLog, high), (ChatDaily, {'high': {'$gt': 0}})):
+        model._get_collection().aggregate([
+            {'$match': match},
+            {'$group': {'_id': '$user_id', 'first_seen': {'$min': '$$NOW'}}},
+            merge,
+        ], allowDiskUse=True)
+
+
+def rebuild_stats():
+    """Recompute the counter document from raw data. Returns the stats dict."""
+    _rebuild_high_risk_markers()
+    stats = compute_stats()
+    _counters().update_one(
+        {'_id': STATS_ID},
+        {'$set': dict(stats, rebuilt_at=datetime.utcnow())},
+        upsert=True,
+    )
+    bump('stats')
+    return stats
+
+
+def get_stats():
+    """Return the precomputed stats (one document read); builds them on first use."""
+    doc = _counters().find_one({'_id': STATS_ID})
+    if doc is None or doc.get('rebuilt_at') is None:
+        return rebuild_stats()
+    return {
+        'high_risk_users': doc.get('high_risk_users', 0),
+        'appointments_by_status': doc.get('appointments_by_status') or {},
+        'assessments_by_level': doc.get('assessments_by_level') or {},
+    }
@@ -0,0 +1,267 @@
+import io
+import os
+import queue
+import tempfile
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from accounts.risk_engine import update_user_risk
+from wellness_connect.testing import MongoTestCase
+
+from . import cascade, classification_service, screenings, stats, trends
+from .models import Appointment, Assessment, CascadeJob, ChatLog, RiskState, StatsCounter, StressTrend
+
+
+class BookSessionTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = User.objects.create_user('s@example.com', 'Student', 'Student', 'pw123456')
+        self.quiet = User.objects.create_user('c1@example.com', 'Quiet', 'Counsellor', 'pw123456')
+        self.busy = User.objects.create_user('c2@example.com', 'Busy', 'Counsellor', 'pw123456')
+        self.client.force_login(self.student)
+
+    def _appointment(self, counsellor, hour):
+        Appointment(student_id=self.student.id, counsellor_id=counsellor.id, date='2030-01-07',
+                    status='Approved', starts_at=datetime(2030, 1, 7, hour), duration_minutes=50).save()
+
+    def _book(self, time='10:00'):
+        return self.client.post(reverse('student:book_session'), {'date': '2030-01-07', 'time': time})
+
+    def test_clash_with_least_loaded_counsellor_books_another(self):
+        self._appointment(self.quiet, 10)  # quiet: 1 booking that day, taken at 10:00
+        self._appointment(self.busy, 9)
+        self._appointment(self.busy, 12)  # busy: 2 bookings, free at 10:00
+        self._book()
+        booked = Appointment.objects(starts_at=datetime(2030, 1, 7, 10), status='Pending').first()
+        self.assertEqual(booked.counsellor_id, self.busy.id)
+
+    def test_least_loaded_free_counsellor_is_picked(self):
+        self._appointment(self.busy, 9)
+        self._book()
+        booked = Appointment.objects(status='Pending').first()
+        self.assertEqual(booked.counsellor_id, self.quiet.id)
+
+    def test_error_only_when_every_counsellor_is_taken(self):
+        self._appointment(self.quiet, 10)
+        self._appointment(self.busy, 10)
+        response = self._book()
+        self.assertContains(response, 'That time is already taken')
+        self.assertEqual(Appointment.objects(status='Pending').count(), 0)
+
+
+class CascadeTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_id = 42
+        for level in ('High', 'High', 'Low'):
+            Assessment(user_id=self.user_id, total_score=0, stress_level=level, final_level=level).save()
+            stats.record_assessment(self.user_id, level)
+        Assessment(user_id=7, total_score=0, stress_level='High', final_level='High').save()
+        stats.record_assessment(7, 'High')
+
+    def _levels(self):
+        return StatsCounter.objects.get(id=stats.STATS_ID).assessments_by_level
+
+    def test_reclaimed_job_counts_each_document_once(self):
+        job = CascadeJob(user_id=self.user_id)
+        job.save()
+        slow = cascade._claim()  # a live but slow worker
+        later = datetime.utcnow() + cascade.STALE_AFTER + timedelta(minutes=1)
+        reclaimed = cascade._claim(now=later)  # another worker takes the job over
+        self.assertEqual(reclaimed['_id'], slow['_id'])
+        cascade.delete_user_documents(self.user_id, heartbeat=cascade._heartbeat(reclaimed))
+        with self.assertRaises(cascade.LeaseLost):
+            cascade.delete_user_documents(self.user_id, heartbeat=cascade._heartbeat(slow))
+        self.assertEqual(self._levels(), {'High': 1, 'Low': 0})
+
+    def test_stats_follow_what_was_deleted(self):
+        cascade.delete_user_documents(self.user_id)
+        cascade.delete_user_documents(self.user_id)  # a second pass finds nothing to count
+        self.assertEqual(self._levels(), {'High': 1, 'Low': 0})
+        self.assertEqual(Assessment.objects(user_id=self.user_id).count(), 0)
+
+    @override_settings(CASCADE_RETRY_SECONDS=60, CASCADE_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_with_backoff(self):
+        CascadeJob(user_id=self.user_id).save()
+        real = cascade.delete_user_documents
+        calls = []
+
+        def fail_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError('down')
+            return real(*args, **kwargs)
+
+        with mock.patch.object(cascade, 'delete_user_documents', side_effect=fail_once):
+            with self.assertLogs('student.cascade', 'ERROR'):
+                self.assertEqual(cascade.run_pending(), 1)
+            job = CascadeJob.objects.get()
+            self.assertEqual((job.status, job.attempts), ('pending', 1))
+            self.assertGreater(job.retry_at, datetime.utcnow())
+            self.assertEqual(cascade.run_pending(), 0)  # not due yet
+
+            CascadeJob.objects.update(retry_at=datetime.utcnow() - timedelta(seconds=1))
+            self.assertEqual(cascade.run_pending(), 1)
+        self.assertEqual(CascadeJob.objects.get().status, 'done')
+        self.assertEqual(Assessment.objects(user_id=self.user_id).count(), 0)
+
+
+def _screening_csv(*forms):
+    """CSV of (email, phq item value, taken_at) forms: every PHQ item set to the value, GAD items 0."""
+    header = ['email'] + screenings.PHQ_ITEMS + screenings.GAD_ITEMS + ['taken_at']
+    lines = [','.join(header)]
+    for email, item, taken_at in forms:
+        lines.append(','.join([email] + [str(item)] * 9 + ['0'] * 7 + [taken_at.isoformat(timespec='seconds')]))
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+class ScreeningImportTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = User.objects.create_user('Jane.Doe@example.com', 'Jane', 'Student', 'pw123456')
+        self.now = datetime.utcnow()
+
+    def _state(self):
+        return RiskState._get_collection().find_one({'_id': self.student.id})
+
+    def test_old_form_does_not_override_newer_assessment(self):
+        update_user_risk(self.student, phq=22, gad=0)  # online assessment, just now
+        result = screenings.import_csv(_screening_csv(('jane.doe@example.com', 0, self.now - timedelta(days=3))))
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(self._state()['last_phq'], 22)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.current_stress_level, 'High')
+
+    def test_form_keeps_its_own_date(self):
+        taken_at = (self.now - timedelta(days=13)).replace(microsecond=0)
+        screenings.import_csv(_screening_csv(('jane.doe@example.com', 2, taken_at)))
+        state = self._state()
+        self.assertEqual((state['last_phq'], state['last_phq_at']), (18, taken_at))
+        self.assertEqual(state['peak_at'], taken_at)
+
+    def test_newest_form_wins_whatever_the_file_order(self):
+        screenings.import_csv(_screening_csv(
+            ('jane.doe@example.com', 1, self.now - timedelta(days=1)),
+            ('jane.doe@example.com', 3, self.now - timedelta(days=5)),
+        ))
+        self.assertEqual(self._state()['last_phq'], 9)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.current_stress_level, 'Low')
+
+    def test_email_matches_case_insensitively(self):
+        result = screenings.import_csv(_screening_csv(('JANE.DOE@EXAMPLE.COM', 1, self.now)))
+        self.assertEqual((result['imported'], result['errors']), (1, []))
+        self.assertEqual(Assessment.objects(user_id=self.student.id).count(), 1)
+
+
+class TrendTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = datetime(2030, 1, 9, 12)  # a Wednesday
+
+    def test_events_update_day_and_week_buckets(self):
+        trends.record_chat(1, 'High', at=self.now)
+        trends.record_chat(1, 'Low', at=self.now - timedelta(days=1))
+        trends.record_assessment(1, 14, 6, at=self.now)
+        trends.record_assessment(1, 9, 11, at=self.now)
+        starts, by_user = trends.sparklines([1, 2], 'week', 2, now=self.now)
+        self.assertEqual(starts, [datetime(2029, 12, 31), datetime(2030, 1, 7)])
+        self.assertEqual(by_user[1]['high'], [0, 1])
+        self.assertEqual(by_user[1]['low'], [0, 1])
+        self.assertEqual(by_user[1]['assessments'], [0, 2])
+        self.assertEqual((by_user[1]['max_phq'], by_user[1]['max_gad']), ([None, 14], [None, 11]))
+        self.assertEqual(by_user[2]['high'], [0, 0])
+        _, days = trends.sparklines([1], 'day', 2, now=self.now)
+        self.assertEqual((days[1]['low'], days[1]['high']), ([1, 0], [0, 1]))
+
+    def test_backfill_keeps_live_writes(self):
+        for level in ('Medium', 'Medium', 'High'):
+            ChatLog(user_id=1, message='m', response='r', stress_level=level, timestamp=self.now).save()
+        for _ in range(3):  # written live while the backfill read the history
+            trends.record_chat(1, 'High', at=self.now)
+        trends.backfill([1])
+        trends.backfill([1])
+        day = StressTrend.objects.get(user_id=1, period='day')
+        self.assertEqual((day.medium, day.high), (2, 3))
+
+
+class ClassificationServiceTests(SimpleTestCase):
+    def _stalled(self, max_pending=1):
+        """A service whose batcher never hands messages to the pool."""
+        service = classification_service.ClassificationService('unused.json', max_pending=max_pending)
+        patcher = mock.patch.object(service, '_dispatch')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(service.shutdown)  # cleanups run last-in first-out: the batcher stops first
+        return service
+
+    def test_full_queue_uses_keyword_rules_at_once(self):
+        service = self._stalled()
+        service.submit('first')
+        with self.assertRaises(queue.Full):
+            service.submit('second')
+        with mock.patch.object(classification_service, 'get_service', return_value=service):
+            self.assertEqual(classification_service.classify('a calm day'), 'Low')
+
+    @override_settings(STRESS_MODEL_TIMEOUT_MS=10)
+    def test_timeout_cancels_and_frees_the_slot(self):
+        service = self._stalled()
+        submitted = []
+        submit = service.submit
+
+        def record(text):
+            submitted.append(submit(text))
+            return submitted[-1]
+
+        with mock.patch.object(classification_service, 'get_service', return_value=service):
+            with mock.patch.object(service, 'submit', side_effect=record):
+                self.assertEqual(classification_service.classify('a calm day'), 'Low')
+        self.assertTrue(submitted[0].cancelled())
+        service.submit('next')  # the cancelled message no longer holds a slot
+
+    def test_warm_loads_the_model_in_every_worker(self):
+        path = os.path.join(tempfile.mkdtemp(), 'model.json')
+        classification_service.BagOfWordsModel(['Low', 'High'], ['exam'], [[0, 1]], [1, 0]).save(path)
+        service = classification_service.ClassificationService(path, workers=2)
+        self.addCleanup(service.shutdown)
+        self.assertEqual([f.result(timeout=60) for f in service.warm()], [['Low'], ['Low']])
+        self.assertEqual(service.submit('exam exam').result(timeout=10), 'High')
+
+    def test_shutdown_stops_the_batcher(self):
+        service = self._stalled()
+        service.submit('queued')
+        thread = service._thread
+        service.shutdown()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(service._dispatch.call_count, 1)  # what was queued is still dispatched
+
+    def test_broken_pool_is_shut_down_and_respawned_after_backoff(self):
+        service = classification_service.ClassificationService('unused.json')
+        broken = service._pool = mock.Mock()
+        with self.assertLogs('student.classification_service', 'WARNING'):
+            service._fail([Future()], BrokenProcessPool(), broken)
+            service._fail([Future()], BrokenProcessPool(), broken)  # another batch of the same pool
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertEqual(service._failures, 1)
+
+        future = Future()
+        with mock.patch.object(classification_service, 'ProcessPoolExecutor') as pool_class:
+            service._dispatch([('text', future)])
+            self.assertIsInstance(future.exception(), classification_service.PoolBackingOff)
+            service._retry_at = 0  # the backoff is over
+            service._dispatch([('text', Future())])
+        pool_class.assert_called_once()
+
+    @override_settings(STRESS_MODEL_PATH='/nonexistent/stress_model.json')
+    def test_unloadable_model_falls_back_to_keyword_rules(self):
+        with mock.patch.object(classification_service, '_service', None):
+            with self.assertLogs('student.classification_service', 'ERROR'):
+                self.assertIsNone(classification_service.get_service())
+            self.assertIsNone(classification_service.get_service())  # logged once, not retried
+            self.assertEqual(classification_service.classify('a calm day'), 'Low')
@@ -0,0 +1,164 @@
+"""
+Per-student stress trends kept in StressTrend buckets, one per user and UTC
+day or week (weeks start on Monday).
+Each chat message and assessment updates the student's day and week buckets
+with one unordered bulk_write of $inc/$max upserts (record_chat,
+record_assessment), so a trend is read from a few small documents instead of
+scanning every ChatLog and Assessment. sparklines() reads a whole page of students in one query on the
+(user_id, period, start) index.
+backfill() rebuilds the buckets from stored history (manage.py backfill_trends):
+raw ChatLogs, ChatDaily for days whose raw logs have expired, and Assessments.
+It merges with $max, so it can run while the site records new events.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from .models import Assessment, ChatDaily, ChatLog, StressTrend
+from .retention import day_of
+
+PERIODS = {'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+LEVEL_FIELDS = {'Low': 'low', 'Medium': 'medium', 'High': 'high'}
+COUNT_FIELDS = ('low', 'medium', 'high', 'assessments')
+MAX_FIELDS = ('max_phq', 'max_gad')
+
+
+def bucket_start(period, at):
+    day = datetime(at.year, at.month, at.day)
+    return day - timedelta(days=day.weekday()) if period == 'week' else day
+
+
+def _buckets(user_id, at):
+    return [{'user_id': user_id, 'period': period, 'start': bucket_start(period, at)} for period in PERIODS]
+
+
+def _upsert(user_id, at, update):
+    ops = [UpdateOne(bucket, update, upsert=True) for bucket in _buckets(user_id, at)]
+    StressTrend._get_collection().bulk_write(ops, ordered=False)  # one round trip for both buckets
+
+
+def _assessment_update(phq, gad):
+    return {'$inc': {'assessments': 1}, '$max': {'max_phq': phq, 'max_gad': gad}}
+
+
+def record_chat(user_id, level, at=None):
+    """Call after saving a ChatLog."""
+    _upsert(user_id, at or datetime.utcnow(), {'$inc': {LEVEL_FIELDS[level]: 1}})
+
+
+def record_assessment(user_id, phq, gad, at=None):
+    """Call after saving an Assessment."""
+    _upsert(user_id, at or datetime.utcnow(), _assessment_update(phq, gad))
+
+
+def record_assessments(rows):
+    """record_assessment for many [(user_id, phq, gad, taken_at), ...] at once (bulk imports)."""
+    ops = [
+        UpdateOne(bucket, _assessment_update(phq, gad), upsert=True)
+        for uid, phq, gad, at in rows for bucket in _buckets(uid, at)
+    ]
+    if ops:
+        StressTrend._get_collection().bulk_write(ops, ordered=False)
+
+
+def sparklines(user_ids, period='week', count=12, now=None):
+    """
+    The last `count` buckets (the current one included) of each user, oldest
+    first. Returns (starts, {user_id: {field: [value per bucket]}}); missing
+    buckets are 0, or None for max_phq / max_gad.
+    """
+    ids = sorted({int(uid) for uid in user_ids})
+    current = bucket_start(period, now or datetime.utcnow())
+    starts = [current - PERIODS[period] * i for i in range(count - 1, -1, -1)]
+    position = {start: i for i, start in enumerate(starts)}
+    trends = {
+        uid: {**{f: [0] * count for f in COUNT_FIELDS}, **{f: [None] * count for f in MAX_FIELDS}}
+        for uid in ids
+    }
+    if not ids:
+        return starts, trends
+    docs = StressTrend._get_collection().find(
+        {'user_id': {'$in': ids}, 'period': period, 'start': {'$gte': starts[0]}},
+        {'_id': 0, 'user_id': 1, 'start': 1, **dict.fromkeys(COUNT_FIELDS + MAX_FIELDS, 1)},
+    )
+    for doc in docs:
+        i = position.get(doc['start'])
+        if i is None:
+            continue
+        for field in COUNT_FIELDS + MAX_FIELDS:
+            if doc.get(field) is not None:
+                trends[doc['user_id']][field][i] = doc[field]
+    return starts, trends
+
+
+def _level_counts():
+    return {field: {'$sum': {'$cond': [{'$eq': ['$stress_level', level]}, 1, 0]}}
+            for level, field in LEVEL_FIELDS.items()}
+
+
+def _daily_history(user_ids):
+    """{(user_id, day): bucket fields} for the users, from all three sources."""
+    days = defaultdict(dict)
+    match = {'user_id': {'$in': user_ids}}
+    for row in ChatLog._get_collection().aggregate([
+        {'$match': match},
+        {'$group': {'_id': {'user_id': '$user_id', 'day': day_of('$timestamp')}, **_level_counts()}},
+    ], allowDiskUse=True):
+        days[row['_id']['user_id'], row['_id']['day']].update({f: row[f] for f in LEVEL_FIELDS.values()})
+    # Roll-ups are exact for finished days and raw logs only shrink as they expire,
+    # so the larger count of the two is the true one
+    fields = {'_id': 0, 'user_id': 1, 'day': 1, **dict.fromkeys(LEVEL_FIELDS.values(), 1)}
+    for row in ChatDaily._get_collection().find(match, fields):
+        bucket = days[row['user_id'], row['day']]
+        for field in LEVEL_FIELDS.values():
+            bucket[field] = max(bucket.get(field, 0), row.get(field, 0))
+    for row in Assessment._get_collection().aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'day': day_of('$created_at')},
+            'assessments': {'$sum': 1}, 'max_phq': {'$max': '$phq_score'}, 'max_gad': {'$max': '$gad_score'},
+        }},
+    ], allowDiskUse=True):
+        days[row['_id']['user_id'], row['_id']['day']].update(
+            {f: row[f] for f in ('assessments',) + MAX_FIELDS})
+    return days
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _merge(fields):
+    """$max the rebuilt fields into the bucket; max_phq / max_gad without assessments stay absent, as in live buckets."""
+    return {'$max': {f: v for f, v in fields.items() if v is not None}}
+
+
+def backfill(user_ids, chunk_size=500):
+    """
+    Rebuild the day and week buckets of `user_ids` from stored history, chunk_size
+    users per read. Each field is merged with $max, so a bucket only ever grows:
+    events recorded by live writes during the rebuild are kept, and re-running
+    is harmless. Counts already too high (e.g. history deleted by hand) are not
+    lowered; delete those buckets before backfilling.
+    Returns the number of buckets written.
+    """
+    user_ids = list(user_ids)
+    written = 0
+    for i in range(0, len(user_ids), chunk_size):
+        buckets = defaultdict(lambda: {**dict.fromkeys(COUNT_FIELDS, 0), **dict.fromkeys(MAX_FIELDS)})
+        for (uid, day), fields in _daily_history(user_ids[i:i + chunk_size]).items():
+            for period in PERIODS:
+                bucket = buckets[uid, period, bucket_start(period, day)]
+                for field in COUNT_FIELDS:
+                    bucket[field] += fields.get(field, 0)
+                for field in MAX_FIELDS:
+                    bucket[field] = _max(bucket[field], fields.get(field))
+        ops = [
+            UpdateOne({'user_id': uid, 'period': period, 'start': start}, _merge(fields), upsert=True)
+            for (uid, period, start), fields in buckets.items()
+        ]
+        if ops:
+            StressTrend._get_collection().bulk_write(ops, ordered=False)
+        written += len(ops)
+    return written
@@ -6,20 +6,22 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib import messages
-from accounts.models import User
 from accounts.risk_engine import update_user_risk
+from wellness_connect.fragments import bump
 
 from .models import ChatLog, Assessment, Appointment
+from . import classification_service, stats, trends
+from .scheduler import scheduler
+from .slots import busy_counsellors, default_duration, parse_start
 
 
 def _stress_from_message(text):
-    """Keyword-based: suicide -> High; sad/anxiety -> Medium; else Low."""
-    t = (text or '').strip().lower()
-    if 'suicide' in t:
-        return 'High'
-    if any(w in t for w in ('sad', 'anxiety', 'anxious', 'depressed')):
-        return 'Medium'
-    return 'Low'
+    """
+    Keyword rules (student.classifier): suicide -> High; sad/anxiety -> Medium; else Low.
+    With settings.STRESS_MODEL_PATH, a bag-of-words model decides below High
+    (student.classification_service).
+    """
+    return classification_service.classify(text)
 
 
 def _response_for_stress(level):
@@ -58,27 +60,33 @@ def chatbot_send(request):
         response=response_text,
         stress_level=stress
     ).save()
+    stats.record_chat(request.user.id, stress)
+    trends.record_chat(request.user.id, stress)
 
     # Risk engine: update user risk from chat
     final_level = update_user_risk(request.user, chat_level=stress)
+    return JsonResponse(_chat_payload(stress, final_level, response_text))
 
+
+def _chat_payload(stress, final_level, response_text):
+    """JSON body for a chatbot reply (shared by the sync and async send views)."""
     # Suggest assessment for Medium/High
     if stress in ('Medium', 'High'):
         response_text += ' We recommend completing a PHQ-9/GAD-7 assessment for better support.'
     if final_level == 'High':
         response_text += ' A counsellor has been notified and will reach out. You are not alone.'
-        return JsonResponse({
+        return {
             'response': response_text,
             'stress_level': stress,
             'show_alert': True,
             'counsellor_notified': True,
-        })
+        }
 
-    return JsonResponse({
+    return {
         'response': response_text,
         'stress_level': stress,
         'show_alert': stress == 'High',
-    })
+    }
 
 
 def _get_phq_gad_from_request(request):
@@ -115,6 +123,9 @@ def assessment_view(request):
             gad_score=gad_score,
             final_level=final_level,
         ).save()
+        stats.record_assessment(request.user.id, final_level)
+        trends.record_assessment(request.user.id, phq_score, gad_score)
+        bump('assessments')
         update_user_risk(request.user, phq=phq_score, gad=gad_score)
         request.session['assessment_result'] = {
             'phq_score': phq_score,
@@ -149,17 +160,31 @@ def book_session_view(request):
         if not date:
             messages.error(request, 'Please select a date.')
             return render(request, 'student/book_session.html')
-        # Need at least one counsellor for appointment
-        counsellor = User.objects.filter(role='Counsellor').first()
-        if not counsellor:
-            messages.error(request, 'No counsellor available. Please try later.')
+        starts_at = parse_start(date, (request.POST.get('time') or '').strip())
+        if starts_at is None:
+            messages.error(request, 'Please select a valid date and time.')
+            return render(request, 'student/book_session.html')
+        date = starts_at.date().isoformat()
+        # Least-loaded counsellor for that date (student.scheduler) among those free at starts_at
+        busy = busy_counsellors(scheduler.counsellor_ids(), starts_at)
+        counsellor_id = scheduler.pick(date, exclude=busy)
+        if counsellor_id is None:
+            if busy:
+                messages.error(request, 'That time is already taken. Please choose another time.')
+            else:
+                messages.error(request, 'No counsellor available. Please try later.')
             return render(request, 'student/book_session.html')
         Appointment(
             student_id=request.user.id,
-            counsellor_id=counsellor.id,
+            counsellor_id=counsellor_id,
             date=date,
-            status='Pending'
+            status='Pending',
+            starts_at=starts_at,
+            duration_minutes=default_duration(),
         ).save()
+        scheduler.record_booking(date, counsellor_id)
+        stats.record_appointment_status(None, 'Pending')
+        bump('appointments', f'appointments:{counsellor_id}')
         messages.success(request, 'Appointment requested. Counsellor will confirm.')
         return redirect('student:student_dashboard')
     return render(request, 'student/book_session.html')
@@ -0,0 +1,19 @@
+"""
+ASGI entry point. Serves the async chatbot send view (student.async_views), and
+streams counsellor alerts (counsellor.views.alerts_stream) without a thread each.
+Run with an ASGI server, e.g. `uvicorn wellness_connect.asgi:application`.
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wellness_connect.settings')
+os.environ.setdefault('CHATBOT_ASYNC', '1')
+# Persistent SQLite connections are per thread and are not closed reliably for the
+# sync_to_async threads ASGI requests run in; open one per request instead
+os.environ.setdefault('CONN_MAX_AGE', '0')
+application = get_asgi_application()
+
+# Spawn the chat model workers now rather than on the first message (no-op without STRESS_MODEL_PATH)
+from student.classification_service import warm  # noqa: E402
+
+warm()
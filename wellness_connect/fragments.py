@@ -0,0 +1,60 @@
+"""
+Version-keyed caching of rendered dashboard fragments.
+Each fragment is cached under the current version of the data namespaces it
+depends on ('risk', 'users', 'appointments:<counsellor id>', ...). Writers call
+bump() for the namespaces they change, which makes every dependent fragment
+miss on its next read; nothing has to be deleted. Version counters never
+expire and restart from the current time in ms if evicted, so an evicted
+counter can never bring back an old version.
+Works with any Django cache backend (local-memory, file-based, ...); use a
+shared backend (file-based) when several worker processes serve the dashboards.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+_PREFIX = 'fragver:'
+
+
+def _fresh_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    """Current version of each namespace, as a tuple in the same order."""
+    keys = [_PREFIX + ns for ns in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), timeout=None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def bump(*namespaces):
+    """Invalidate every fragment that depends on any of `namespaces`."""
+    for ns in namespaces:
+        key = _PREFIX + ns
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_version(), timeout=None)
+
+
+def cached_fragment(name, namespaces, render, vary=(), timeout=None):
+    """
+    Return the cached HTML for fragment `name`, calling render() (which returns
+    a string) only when one of `namespaces` changed or the entry expired.
+    `vary` holds extra key parts (e.g. the page cursor); they are hashed.
+    """
+    versions = get_versions(namespaces)
+    digest = hashlib.md5(repr((tuple(vary), versions)).encode('utf-8')).hexdigest()
+    key = f'frag:{name}:{digest}'
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, settings.FRAGMENT_CACHE_SECONDS if timeout is None else timeout)
+    return mark_safe(html)
@@ -0,0 +1,210 @@
+"""
+Per-request query accounting and a Prometheus-style /metrics endpoint.
+query_accounting_middleware counts and times the Django SQL queries and MongoDB
+commands each request makes and aggregates them per URL name
+('student:chatbot_send', 'counsellor:counsellor_dashboard', ...) in in-process
+histograms. Requests over settings.QUERY_BUDGETS log a warning.
+SQL is seen through an execute wrapper installed on every database connection;
+MongoDB through mongo_listener, a pymongo command listener that
+wellness_connect.mongo passes to every client it creates. Both attribute work to
+the current request through a context variable, so queries run from
+sync_to_async threads are counted too. Histograms are per process; each worker
+serves its own /metrics.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.decorators import sync_and_async_middleware
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+DEFAULT_BUDGET = {'sql': 20, 'mongo': 20}
+
+_current = ContextVar('request_cost', default=None)
+
+
+class RequestCost:
+    __slots__ = ('sql', 'sql_seconds', 'mongo', 'mongo_seconds')
+
+    def __init__(self):
+        self.sql = 0
+        self.sql_seconds = 0.0
+        self.mongo = 0
+        self.mongo_seconds = 0.0
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition layout."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+_HISTOGRAMS = {
+    'wellness_request_duration_seconds': ('Request latency', DURATION_BUCKETS, lambda c, s: s),
+    'wellness_request_sql_queries': ('SQL queries per request', COUNT_BUCKETS, lambda c, s: c.sql),
+    'wellness_request_sql_seconds': ('SQL time per request', DURATION_BUCKETS, lambda c, s: c.sql_seconds),
+    'wellness_request_mongo_commands': ('MongoDB commands per request', COUNT_BUCKETS, lambda c, s: c.mongo),
+    'wellness_request_mongo_seconds': ('MongoDB time per request', DURATION_BUCKETS, lambda c, s: c.mongo_seconds),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}  # view name -> {metric name: Histogram}
+        self._over_budget = {}  # (view name, 'sql' | 'mongo') -> count
+
+    def record(self, view, cost, seconds, over_budget=()):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {
+                    name: Histogram(buckets) for name, (_, buckets, _) in _HISTOGRAMS.items()
+                }
+            for name, (_, _, value) in _HISTOGRAMS.items():
+                histograms[name].observe(value(cost, seconds))
+            for kind in over_budget:
+                self._over_budget[view, kind] = self._over_budget.get((view, kind), 0) + 1
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            out = []
+            for name, (help_text, _, _) in _HISTOGRAMS.items():
+                out += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for view in sorted(self._views):
+                    out.extend(self._views[view][name].lines(name, f'view="{view}"'))
+            name = 'wellness_query_budget_exceeded_total'
+            out += [f'# HELP {name} Requests over their query budget', f'# TYPE {name} counter']
+            for (view, kind), count in sorted(self._over_budget.items()):
+                out.append(f'{name}{{view="{view}",kind="{kind}"}} {count}')
+            return '\n'.join(out) + '\n'
+
+
+registry = Registry()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Adds each finished MongoDB command to the current request's cost."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        cost = _current.get()
+        if cost is not None:
+            cost.mongo += 1
+            cost.mongo_seconds += event.duration_micros / 1e6
+
+
+mongo_listener = MongoCommandListener()
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    cost = _current.get()
+    if cost is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        cost.sql += 1
+        cost.sql_seconds += time.perf_counter() - started
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def _budget(view):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return {**DEFAULT_BUDGET, **budgets.get('default', {}), **budgets.get(view, {})}
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'  # keeps 404 paths out of the labels
+
+
+def _finish(request, cost, started):
+    seconds = time.perf_counter() - started
+    view = _view_name(request)
+    budget = _budget(view)
+    over = [kind for kind in ('sql', 'mongo') if getattr(cost, kind) > budget[kind]]
+    if over:
+        logger.warning(
+            'Query budget exceeded by %s %s: %d SQL queries (budget %d), %d Mongo commands (budget %d)',
+            view, request.path, cost.sql, budget['sql'], cost.mongo, budget['mongo'],
+        )
+    registry.record(view, cost, seconds, over)
+
+
+@sync_and_async_middleware
+def query_accounting_middleware(get_response):
+    connection_created.connect(_install_sql_wrapper, dispatch_uid='metrics_sql_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _install_sql_wrapper(connection)
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            cost, started = RequestCost(), time.perf_counter()
+            token = _current.set(cost)
+            try:
+                return await get_response(request)
+            finally:
+                _current.reset(token)
+                _finish(request, cost, started)
+    else:
+        def middleware(request):
+            cost, started = RequestCost(), time.perf_counter()
+            token = _current.set(cost)
+            try:
+                return get_response(request)
+            finally:
+                _current.reset(token)
+                _finish(request, cost, started)
+    return middleware
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; only served to settings.METRICS_ALLOWED_IPS."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
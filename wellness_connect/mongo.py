@@ -0,0 +1,71 @@
+"""
+MongoDB connection management.
+connect() registers the mongoengine default connection without any network I/O;
+pymongo opens pooled sockets on the first query, so manage.py commands that never
+touch Mongo (migrate, check, ...) do not wait for it and do not fail when it is
+briefly unreachable. Pool size and timeouts come from settings.MONGODB_OPTIONS.
+get_async_db() returns the async (pymongo AsyncMongoClient) database used by
+async views under ASGI. Clients are bound to an event loop, so one is kept per
+running loop.
+Every client reports its commands to metrics.mongo_listener (per-request accounting).
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import mongoengine
+from django.conf import settings
+from mongoengine.connection import get_db
+from pymongo import AsyncMongoClient
+
+from .metrics import mongo_listener
+
+_lock = threading.Lock()
+_connected = False
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def connect():
+    """Register the default mongoengine connection (idempotent, no I/O)."""
+    global _connected
+    with _lock:
+        if _connected:
+            return
+        mongoengine.connect(
+            db=settings.MONGODB_NAME,
+            host=settings.MONGODB_URI,
+            connect=False,
+            event_listeners=[mongo_listener],
+            **settings.MONGODB_OPTIONS,
+        )
+        _connected = True
+
+
+def health_check():
+    """
+    Ping the server. Returns {'ok': bool, 'latency_ms': float, 'error': str or None};
+    never raises, so it can back a readiness probe.
+    """
+    connect()
+    started = time.monotonic()
+    try:
+        get_db().client.admin.command('ping')
+        error = None
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+    return {
+        'ok': error is None,
+        'latency_ms': round((time.monotonic() - started) * 1000, 1),
+        'error': error,
+    }
+
+
+def get_async_db():
+    """Async database handle for the current event loop (call from async code)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncMongoClient(settings.MONGODB_URI, event_listeners=[mongo_listener], **settings.MONGODB_OPTIONS)
+        _async_clients[loop] = client
+    return client[settings.MONGODB_NAME]
@@ -0,0 +1,30 @@
+"""
+Opaque cursors for keyset (seek) pagination.
+A cursor is the sort key of the last row on a page, encoded as URL-safe text.
+Views decode it and filter "after this key" instead of using OFFSET.
+"""
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Encode a list of JSON-serialisable sort-key values as a cursor string."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Decode a cursor made by encode_cursor. Returns a list of `size` values,
+    or None if the token is empty or malformed.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
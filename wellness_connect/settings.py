@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'wellness_connect.metrics.query_accounting_middleware',  # first, so it sees every query
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'wellness_connect.throttling.RateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'wellness_connect.urls'
@@ -56,21 +58,64 @@ TEMPLATES = [
 
 
 WSGI_APPLICATION = 'wellness_connect.wsgi.application'
+ASGI_APPLICATION = 'wellness_connect.asgi.application'
 
-# SQLite for auth and sessions (Django default)
+# Serve the async chatbot send view (set by asgi.py; keep off under WSGI)
+CHATBOT_ASYNC = os.environ.get('CHATBOT_ASYNC', '0') == '1'
+
+# SQLite for auth and sessions (Django default), tuned for concurrent writers
+# by wellness_connect/sqlite.py: WAL journal, busy timeout, persistent connections
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),  # seconds to wait on a lock
+        },
+        # Reuse connections under WSGI; asgi.py sets 0, as persistent connections leak under ASGI
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 # MongoEngine connection (for ChatLogs, Assessments, Appointments)
 # Set MONGODB_URI in env for Atlas; default is local mongodb://localhost:27017
-import mongoengine
+# Registered lazily by wellness_connect/mongo.py (StudentConfig.ready); no I/O at import.
 MONGODB_NAME = os.environ.get('MONGODB_NAME', 'wellness_connect_db')
 MONGODB_URI = os.environ.get('MONGODB_URI', f'mongodb://localhost:27017/{MONGODB_NAME}')
-mongoengine.connect(host=MONGODB_URI, db=MONGODB_NAME)
+MONGODB_OPTIONS = {
+    'maxPoolSize': int(os.environ.get('MONGODB_MAX_POOL_SIZE', '50')),
+    'minPoolSize': int(os.environ.get('MONGODB_MIN_POOL_SIZE', '0')),
+    'maxIdleTimeMS': int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', '60000')),
+    'serverSelectionTimeoutMS': int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    'connectTimeoutMS': int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS', '5000')),
+    'socketTimeoutMS': int(os.environ.get('MONGODB_SOCKET_TIMEOUT_MS', '20000')),
+    'retryWrites': os.environ.get('MONGODB_RETRY_WRITES', '1') == '1',
+}
+
+# Cache (dashboard fragments, wellness_connect/fragments.py; rate limits,
+# wellness_connect/throttling.py). Local memory is per process; set REDIS_URL
+# (pip install redis) or CACHE_DIR (a file-based cache) to share it between workers.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_DIR = os.environ.get('CACHE_DIR')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    } if CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wellness-connect',
+    },
+}
+FRAGMENT_CACHE_SECONDS = int(os.environ.get('FRAGMENT_CACHE_SECONDS', '600'))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -101,3 +146,87 @@ LOGOUT_REDIRECT_URL = 'accounts:login'
 ROLE_STUDENT = 'Student'
 ROLE_COUNSELLOR = 'Counsellor'
 ROLE_ADMIN = 'Admin'
+
+# Students per page on the counsellor dashboard (keyset paginated per risk tier)
+COUNSELLOR_PAGE_SIZE = int(os.environ.get('COUNSELLOR_PAGE_SIZE', '25'))
+
+# Users per page in the admin user directory (cursor paginated, newest first)
+ADMIN_USERS_PAGE_SIZE = int(os.environ.get('ADMIN_USERS_PAGE_SIZE', '50'))
+
+# Chatbot stress keywords per level (see student/classifier.py); whole words,
+# trailing '*' matches a prefix. Unset uses student.classifier.DEFAULT_KEYWORDS.
+# STRESS_KEYWORDS = {'High': ['suicid*'], 'Medium': ['sad', 'anxious']}
+
+# Optional bag-of-words chat classifier run in a process pool (student/classification_service.py;
+# `manage.py train_stress_model` writes the file). Unset uses the keyword rules only.
+STRESS_MODEL_PATH = os.environ.get('STRESS_MODEL_PATH', '')
+STRESS_MODEL_WORKERS = int(os.environ.get('STRESS_MODEL_WORKERS', '2'))
+# Messages arriving within this window are classified as one batch (at most STRESS_BATCH_MAX)
+STRESS_BATCH_WINDOW_MS = int(os.environ.get('STRESS_BATCH_WINDOW_MS', '10'))
+STRESS_BATCH_MAX = int(os.environ.get('STRESS_BATCH_MAX', '64'))
+# A chat reply waits at most this long for the model, then uses the keyword rules
+STRESS_MODEL_TIMEOUT_MS = int(os.environ.get('STRESS_MODEL_TIMEOUT_MS', '200'))
+# Messages waiting for the model per process; further ones use the keyword rules at once
+STRESS_QUEUE_MAX = int(os.environ.get('STRESS_QUEUE_MAX', '256'))
+
+# How often each process re-syncs counsellor booking loads from MongoDB (student/scheduler.py)
+COUNSELLOR_LOAD_REFRESH_SECONDS = int(os.environ.get('COUNSELLOR_LOAD_REFRESH_SECONDS', '300'))
+
+# Appointment calendar (student/slots.py): default length, slot grid and working hours
+APPOINTMENT_DURATION_MINUTES = 50
+APPOINTMENT_SLOT_STEP_MINUTES = 60
+COUNSELLING_DAY_START = 9
+COUNSELLING_DAY_END = 17
+
+# Max lifetime of one counsellor alert SSE connection; the browser reconnects after it
+ALERTS_STREAM_SECONDS = int(os.environ.get('ALERTS_STREAM_SECONDS', '300'))
+# Under WSGI every open alert stream pins a worker thread for ALERTS_STREAM_SECONDS;
+# at most this many run per process, other dashboards poll every ALERTS_POLL_SECONDS.
+# Under ASGI (asgi.py) streams are async and hold no thread, so this cap does not apply.
+ALERTS_SYNC_STREAMS = int(os.environ.get('ALERTS_SYNC_STREAMS', '4'))
+ALERTS_POLL_SECONDS = int(os.environ.get('ALERTS_POLL_SECONDS', '5'))
+
+# Non-escalating risk-field changes are held this long and written in one batch
+# (accounts/risk_writes.py); 0 writes every change immediately
+RISK_WRITE_COALESCE_SECONDS = float(os.environ.get('RISK_WRITE_COALESCE_SECONDS', '5'))
+
+# Raw chat logs expire after this many days (TTL index, 0 keeps them forever).
+# Run `manage.py rollup_chats` daily: it folds finished days into chat_daily first,
+# then creates/updates the TTL index (student/retention.py).
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', '180'))
+
+# Background removal of a deleted user's MongoDB documents (student/cascade.py):
+# documents per delete batch and the pause between batches
+CASCADE_BATCH_SIZE = int(os.environ.get('CASCADE_BATCH_SIZE', '1000'))
+CASCADE_BATCH_PAUSE_SECONDS = float(os.environ.get('CASCADE_BATCH_PAUSE_SECONDS', '0.05'))
+# A failed job is retried after CASCADE_RETRY_SECONDS, doubling each time, up to CASCADE_MAX_ATTEMPTS runs
+CASCADE_RETRY_SECONDS = int(os.environ.get('CASCADE_RETRY_SECONDS', '60'))
+CASCADE_MAX_ATTEMPTS = int(os.environ.get('CASCADE_MAX_ATTEMPTS', '5'))
+
+# Chat messages per page on the counsellor chat history (cursor paginated)
+CHAT_HISTORY_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_PAGE_SIZE', '50'))
+
+# Per-request query accounting (wellness_connect/metrics.py). A request that makes
+# more SQL queries or Mongo commands than its budget logs a warning; 'default'
+# applies to every URL name without its own entry.
+QUERY_BUDGETS = {
+    'default': {'sql': 20, 'mongo': 20},
+    'counsellor:counsellor_dashboard': {'sql': 10, 'mongo': 5},
+    'student:chatbot_send': {'sql': 10, 'mongo': 8},
+}
+# Clients allowed to scrape /metrics
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Rate limits per URL name (wellness_connect/throttling.py), kept in the default cache,
+# as 'count/period' (s, min, hour, day); only POSTs are limited unless 'methods' is
+# given. Throttled requests get a JSON 429 with Retry-After.
+# 'user': a token bucket per user (per IP when anonymous), allowing bursts of `count`.
+# 'global': at most `count` requests per `period` window from everyone, counted with
+# atomic cache.add/incr. It holds across workers only with REDIS_URL (or Memcached);
+# with local memory it applies per worker process (N workers admit up to N times the
+# rate), and with CACHE_DIR concurrent workers may lose counts.
+RATE_LIMITS = {
+    'student:chatbot_send': {'user': '20/min', 'global': '1200/min'},
+    'student:assessment': {'user': '5/min', 'global': '300/min'},
+    'student:book_session': {'user': '5/min', 'global': '120/min'},
+}
@@ -0,0 +1,17 @@
+"""
+SQLite connection profile for concurrent traffic.
+configure_connection() runs on every new connection (connection_created, wired
+in AccountsConfig.ready): WAL lets readers and the single writer proceed at the
+same time, and synchronous=NORMAL is safe under WAL while avoiding an fsync per
+commit. Waiting on a locked database is bounded by DATABASES OPTIONS 'timeout'
+(the busy timeout); connections are kept for CONN_MAX_AGE seconds.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}')
+        cursor.execute(f'PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}')
@@ -0,0 +1,59 @@
+"""
+Test helpers: run the MongoDB side of the app on mongomock (pip install mongomock),
+so `manage.py test` and `python -m benchmarks.load --mongomock` need no mongod.
+MongoTestCase connects once and empties every collection before each test, along
+with the in-process state kept between requests (cache, scheduler loads, held
+risk writes). Tests that need it are skipped when mongomock is not installed.
+"""
+import unittest
+
+from django.core.cache import cache
+from django.test import TestCase
+
+try:
+    import mongomock
+except ImportError:  # optional; only tests and benchmarks use it
+    mongomock = None
+
+
+def _drop_sort(method):
+    def wrapper(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def connect_mongomock(db='wellness_test'):
+    """Point the default mongoengine connection at an in-memory mongomock database."""
+    import mongoengine
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.11 passes sort= to bulk update ops; mongomock 4.x does not accept it
+    if not getattr(BulkOperationBuilder, '_accepts_sort', False):
+        BulkOperationBuilder.add_update = _drop_sort(BulkOperationBuilder.add_update)
+        BulkOperationBuilder.add_replace = _drop_sort(BulkOperationBuilder.add_replace)
+        BulkOperationBuilder._accepts_sort = True
+    mongoengine.disconnect_all()
+    mongoengine.connect(db=db, host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+
+
+@unittest.skipIf(mongomock is None, 'mongomock is not installed')
+class MongoTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connect_mongomock()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+
+        from accounts.risk_writes import buffer
+        from student.scheduler import scheduler
+
+        super().setUp()
+        db = get_db()
+        for name in db.list_collection_names():
+            db[name].delete_many({})
+        cache.clear()
+        scheduler._counsellors = None
+        with buffer._lock:
+            buffer._pending.clear()
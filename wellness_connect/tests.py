@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+
+from . import throttling
+
+LIMITS = {'student:book_session': {'user': '2/min', 'global': '3/min'}}
+
+
+@override_settings(RATE_LIMITS=LIMITS)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('student:book_session')
+        clock = mock.patch.object(throttling, 'time', mock.Mock(time=lambda: 1000.0))  # 40 s into a minute
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def _post_as(self, email):
+        user = User.objects.filter(email=email).first() or User.objects.create_user(email, 'A', 'Student', 'pw123456')
+        self.client.force_login(user)
+        return self.client.post(self.url, {})  # no date: the view answers without touching MongoDB
+
+    def test_throttled_request_gets_429_with_retry_after(self):
+        self.assertNotEqual(self._post_as('a@example.com').status_code, 429)
+        self.assertNotEqual(self._post_as('a@example.com').status_code, 429)
+        response = self._post_as('a@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')  # 2/min refills one token in 30 s
+        self.assertEqual(response.json()['retry_after'], 30)
+
+    def test_global_limit_is_shared_by_all_users(self):
+        for email in ('a@example.com', 'b@example.com', 'c@example.com'):
+            self.assertNotEqual(self._post_as(email).status_code, 429)
+        response = self._post_as('d@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')  # until the minute's window ends
+
+    def test_request_refused_per_user_is_not_counted_globally(self):
+        for _ in range(3):
+            self._post_as('a@example.com')  # the third is refused by a's own bucket
+        self.assertNotEqual(self._post_as('b@example.com').status_code, 429)
+
+    def test_gets_are_not_limited(self):
+        self._post_as('a@example.com')
+        for _ in range(5):
+            self.assertNotEqual(self.client.get(self.url).status_code, 429)
+
+
+class CountSharedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fixed_window_counts_and_resets(self):
+        self.assertEqual(throttling.count_shared('t:all', '2/min', now=60), 0)
+        self.assertEqual(throttling.count_shared('t:all', '2/min', now=90), 0)
+        self.assertEqual(throttling.count_shared('t:all', '2/min', now=110), 10)
+        self.assertEqual(cache.get('t:all:1'), 2)  # the refused request was given back
+        self.assertEqual(throttling.count_shared('t:all', '2/min', now=120), 0)  # next window
+
+
+class TakeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_buckets_refill_and_are_taken_together(self):
+        buckets = {'t:user': '1/s', 't:global': '2/s'}
+        self.assertEqual(throttling.take(buckets, now=100), 0)
+        self.assertAlmostEqual(throttling.take(buckets, now=100), 1)  # user bucket empty
+        self.assertAlmostEqual(cache.get('t:global')[0], 1)  # a refused request takes nothing
+        self.assertEqual(throttling.take(buckets, now=101), 0)
@@ -0,0 +1,149 @@
+"""
+Rate limits per URL name, kept in Django's default cache.
+settings.RATE_LIMITS maps a URL name to a 'user' limit (per user, or per client
+IP when anonymous) and/or a 'global' limit (shared by everyone), each written
+as 'count/period' with period s, min, hour or day. A request over either limit
+gets a JSON 429 with Retry-After and never reaches the view.
+
+The 'user' limit is a token bucket: it holds `count` tokens and refills at
+count/period, so bursts are allowed and the rate is smooth. It is a read-modify-
+write, serialised per process only; one user's requests racing in two workers
+may get a token or two extra, which does not matter for a per-user limit.
+
+The 'global' limit protects the database, so it must hold across workers: it is
+a fixed window of `period` seconds counted with cache.add() and cache.incr()
+only, which are atomic across processes on Redis and Memcached (REDIS_URL in
+settings.CACHES). On the local-memory cache they are atomic within one process,
+so the limit applies per worker; on the file-based cache (CACHE_DIR) incr() is a
+get and a set, so concurrent workers can lose counts. A window may admit up to
+`count` requests at its very end and `count` more at the start of the next.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'hour': 3600, 'day': 86400}
+DEFAULT_METHODS = ('POST',)
+
+_lock = threading.Lock()
+_parsed = {}
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 0.5): bucket size and tokens refilled per second."""
+    if rate not in _parsed:
+        count, _, period = rate.partition('/')
+        count = int(count)
+        if count < 1 or period not in PERIODS:
+            raise ValueError(f'Invalid rate {rate!r}; use e.g. 30/min')
+        _parsed[rate] = (count, count / PERIODS[period])
+    return _parsed[rate]
+
+
+def _client_key(request):
+    user = request.user
+    if user.is_authenticated:
+        return f'u{user.pk}'
+    return f'ip{request.META.get("REMOTE_ADDR", "")}'
+
+
+def _window(key, rate, now):
+    """(cache key of the fixed window holding `now`, allowed count, seconds until it ends)."""
+    count, per_second = parse_rate(rate)
+    period = count / per_second
+    window = int(now // period)
+    return f'{key}:{window}', count, (window + 1) * period - now
+
+
+def count_shared(key, rate, now=None):
+    """
+    Count one request against the fixed-window limit `rate` shared by all
+    processes. Returns 0 when allowed, else the seconds until the window ends
+    (a refused request is not counted).
+    """
+    now = time.time() if now is None else now
+    window_key, count, remaining = _window(key, rate, now)
+    timeout = math.ceil(remaining) + 1
+    if cache.add(window_key, 1, timeout=timeout):
+        used = 1
+    else:
+        try:
+            used = cache.incr(window_key)
+        except ValueError:  # expired in between
+            cache.add(window_key, 1, timeout=timeout)
+            used = 1
+    if used <= count:
+        return 0
+    release_shared(key, rate, now)
+    return remaining
+
+
+def release_shared(key, rate, now):
+    """Take back a request counted by count_shared(key, rate, now)."""
+    try:
+        cache.decr(_window(key, rate, now)[0])
+    except ValueError:  # the window already expired
+        pass
+
+
+def take(buckets, now=None):
+    """
+    Take one token from every bucket in {cache key: rate} if all of them have
+    one. Returns 0 when allowed, else the seconds until the emptiest refills.
+    """
+    now = time.time() if now is None else now
+    with _lock:  # serialises this process; other workers race (see module docstring)
+        stored = cache.get_many(list(buckets))
+        levels, wait = {}, 0.0
+        for key, rate in buckets.items():
+            capacity, per_second = parse_rate(rate)
+            tokens, updated = stored.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * per_second)
+            levels[key] = (tokens, capacity / per_second)
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / per_second)
+        if wait:
+            return wait
+        # A bucket left alone until it is full again is the same as no bucket, so each
+        # may expire then; keeping one longer is harmless (refills stop at capacity)
+        timeout = math.ceil(max(full_after for _, full_after in levels.values())) + 1
+        cache.set_many({key: (tokens - 1, now) for key, (tokens, _) in levels.items()}, timeout=timeout)
+        return 0
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Applies settings.RATE_LIMITS; runs once the URL is resolved, before the view."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        for limits in getattr(settings, 'RATE_LIMITS', {}).values():  # a bad rate fails at startup
+            for kind in ('user', 'global'):
+                if limits.get(kind):
+                    parse_rate(limits[kind])
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = request.resolver_match.view_name if request.resolver_match else None
+        limits = getattr(settings, 'RATE_LIMITS', {}).get(view)
+        if not limits or request.method not in limits.get('methods', DEFAULT_METHODS):
+            return None
+        now = time.time()
+        wait = 0
+        if limits.get('global'):
+            wait = count_shared(f'ratelimit:{view}', limits['global'], now)
+        if not wait and limits.get('user'):
+            wait = take({f'ratelimit:{view}:{_client_key(request)}': limits['user']}, now)
+            if wait and limits.get('global'):  # refused after all: not counted globally either
+                release_shared(f'ratelimit:{view}', limits['global'], now)
+        if not wait:
+            return None
+        seconds = math.ceil(wait)
+        message = f'Too many requests. Please try again in {seconds} second{"s" if seconds != 1 else ""}.'
+        # 'response' is what the chatbot page shows as the bot's reply
+        response = JsonResponse({'error': message, 'response': message, 'retry_after': seconds}, status=429)
+        response['Retry-After'] = str(seconds)
+        return response
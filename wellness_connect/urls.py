@@ -4,10 +4,13 @@ Main URL configuration. Includes accounts, student, counsellor, admin_panel.
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
     path('student/', include('student.urls')),
     path('counsellor/', include('counsellor.urls')),
     path('admin_panel/', include('admin_panel.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
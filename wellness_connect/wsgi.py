@@ -3,3 +3,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wellness_connect.settings')
 application = get_wsgi_application()
+
+# Spawn the chat model workers now rather than on the first message (no-op without STRESS_MODEL_PATH)
+from student.classification_service import warm  # noqa: E402
+
+warm()